@@ -15,7 +15,7 @@ class Bearing(object):
             a_rpm:int=2000,a_dB:float=8.4074,a_theta:float=15.17,
             a_L:float=3.8,a_N:int=5,
             a_lambda:np.ndarray=[0.7,0.7,0.8,0.8,0.8],
-            a_delta:np.ndarray=[0.5,0,0.5,0,0.7]):
+            a_delta:np.ndarray=[0.5,0,0.5,0,0.7],a_defect:Defect=None):
 
     # def __init__(self,a_n:int=16,a_dP:float=71.501,a_race:str='outer',
             # a_rpm:int=2000,a_dB:float=8.4074,a_theta:float=15.17,
@@ -33,21 +33,42 @@ class Bearing(object):
         else: 
             print("error ! Race should be either 'inner' or 'outer'")
             return 1
+        if a_defect is not None:
+            # Defect given directly, e.g. Defect.from_file of a profile scan
+            a_L=a_defect.m_L
         self.m_rpm=a_rpm/60 # Rpm of the bearing (rev/min)->(rad/s)
         # The duration spent by a ball on the bearing defect (from eq it does
         # not depends on the race affected
         self.m_duration=2*a_L*a_dP/(self.m_rpm*math.pi\
                 *(a_dP**2-(a_dB*math.cos(a_theta))**2))
-        #Create the rolling elements, note that they are not used at any point
-        #   I have only created that to reflect the reality of a Rolling Element
+        #The rolling elements reflect the reality of a Rolling Element
         #   bearing, and in case we don't want all the ball to be the same
-        #   for example we can image a ball to be smaller than the others
-        self.m_ballList = [RollingElement(a_dB, self.m_duration) for i in range(self.m_n)]
-        self.m_defect=Defect(a_L,a_N,a_lambda,a_delta)
+        #   for example we can image a ball to be smaller than the others.
+        #   They are only created when m_ballList is first used
+        self.m_balls=None
+        if a_defect is None:
+            a_defect=Defect(a_L,a_N,a_lambda,a_delta)
+        self.m_defect=a_defect
         self.m_theta=a_theta*math.pi/180 # The contact
         self.m_duration_between_ball=1/self.get_BPFO_freq()
                 #angle of the bearing (deg)->(rad)
 
+    @property
+    def m_ballList(self):
+        if self.m_balls is None:
+            self.m_balls=[RollingElement(self.m_dB,self.m_duration)\
+                    for i in range(self.m_n)]
+        return self.m_balls
+
+    def get_ball_durations(self):
+        """
+        Duration spent in the defect by each rolling element, the same for
+        all of them unless the rolling elements were changed
+        """
+        if self.m_balls is None:
+            return np.full(self.m_n,self.m_duration)
+        return np.array([ball.m_duration for ball in self.m_balls])
+
     def get_BPFO_freq(self):
         # See proposal page 3 for the derivation of the BPFO defect frequencies
         defect_frequency=self.m_n/2*self.m_rpm*\
@@ -1,3 +1,4 @@
+import bisect
 import numpy as np
 
 class Defect(object):
@@ -19,25 +20,100 @@ class Defect(object):
         self.m_delta_filtered=filtered_intervals[2]
         # X position of the interval that will enter in contact with the RE
         self.m_x_pos_filtered=filtered_intervals[3]
+        # Boundary index of the filtered intervals, see find_interval
+        self.build_index()
 
     def filter_interval(self):
         """
-        Extract the intervals that will be in contact with the rolling element
-        """
-        i=0
-        m_index_filtered=[]
-        m_lambda_filtered=np.array([])
-        m_delta_filtered=np.array([])
-        m_x_pos_filtered=np.array([])
-        for i in range(self.m_N+1):
-            if np.argmin(self.m_delta[i:])==0:
-                m_index_filtered.append(i)
-                m_lambda_filtered=np.append(m_lambda_filtered,\
-                        [self.m_lambda[i]])
-                m_delta_filtered=np.append(m_delta_filtered,[self.m_delta[i]])
-                m_x_pos_filtered=np.append(m_x_pos_filtered,\
-                        [np.sum(self.m_lambda[0:i])])
+        Extract the intervals that will be in contact with the rolling element:
+        the intervals not deeper than any interval after them. O(N) with a
+        suffix minimum of the depths and a prefix sum of the widths
+        """
+        # Minimum depth of the intervals after each interval. Same choice as
+        # np.argmin(self.m_delta[i:])==0, including a NaN depth which is
+        # its own minimum
+        after=np.minimum.accumulate(self.m_delta[::-1])[::-1]
+        after=np.append(after[1:],[np.inf])
+        selected=(self.m_delta<=after)|np.isnan(self.m_delta)
+        m_index_filtered=np.flatnonzero(selected)
+        # Position of the beginning of every interval
+        x_pos=np.concatenate(([0],np.cumsum(self.m_lambda[:-1])))
+        # The trailing interval begins at the end of the defect: same
+        # summation as a_L=sum(a_lambda), pairwise past 8 widths unlike the
+        # prefix sum, so it begins exactly at m_L (see build_index)
+        x_pos[-1]=np.sum(self.m_lambda[:-1])
+        return (m_index_filtered,self.m_lambda[selected],\
+                self.m_delta[selected],x_pos[selected])
 
-        return (m_index_filtered,m_lambda_filtered,m_delta_filtered,m_x_pos_filtered)
+    @classmethod
+    def from_profile(cls,a_delta:np.ndarray,a_lambda=1.0):
+        """
+        Defect of a measured depth profile, a_delta holds the depth of each
+        interval and a_lambda their width (the sampling step of the scan) or
+        an array of widths. The length of the defect is the sum of the widths
+        """
+        a_delta=np.asarray(a_delta,dtype=float).reshape(-1)
+        a_lambda=np.broadcast_to(np.asarray(a_lambda,dtype=float),a_delta.shape)
+        # Same summation as the trailing position of filter_interval, so it
+        # begins exactly at m_L
+        a_L=float(np.sum(np.array(a_lambda)))
+        return cls(a_L,a_delta.size,a_lambda,a_delta)
+
+    @classmethod
+    def from_file(cls,a_file_name:str,a_lambda=1.0):
+        """
+        Defect of a profile scan saved as .npy or text (.csv is comma
+        separated), either one column of depths sampled every a_lambda or
+        two columns of position and depth. With positions, each interval
+        spans to the next position and the last one has the previous width
+        """
+        if a_file_name.endswith(".npy"):
+            profile=np.load(a_file_name)
+        else:
+            delimiter="," if a_file_name.endswith(".csv") else None
+            profile=np.loadtxt(a_file_name,delimiter=delimiter,ndmin=2)
+            if profile.shape[1]==1:
+                profile=profile[:,0]
+        if profile.ndim==1:
+            return cls.from_profile(profile,a_lambda)
+        position,depth=profile[:,0],profile[:,1]
+        widths=np.diff(position)
+        return cls.from_profile(depth,np.append(widths,widths[-1:]))
 
+    def build_index(self):
+        """
+        Sorted boundaries of the filtered intervals, built once so the
+        interval under a position is found by bisection instead of a scan
+        """
+        begin=self.m_x_pos_filtered
+        end=begin+self.m_lambda_filtered
+        self.m_index_begin=begin.tolist()
+        self.m_index_end=end.tolist()
+        # Intervals before k_first_end all end before x: the first k with
+        # max(end[:k+1])>x. Intervals from k_last_begin on all begin after x:
+        # the first k with min(begin[k:])>=x. Both bounds hold even when the
+        # rounding of the positions breaks their order
+        self.m_index_max_end=np.maximum.accumulate(end).tolist()
+        self.m_index_min_begin=np.minimum.accumulate(begin[::-1])[::-1].tolist()
+        # First interval beginning at the end of the defect
+        at_L=np.flatnonzero(begin==self.m_L)
+        self.m_index_L=int(at_L[0]) if at_L.size else len(begin)
 
+    def find_interval(self,a_x:float,a_touched:int=0):
+        """
+        Filtered interval under the position a_x, a_touched is the bitmask of
+        the intervals already touched by the rolling element. Same result as
+        testing every interval in order: the first interval with
+        begin<a_x<end not touched yet, or the first one beginning at m_L when
+        m_L<a_x. Returns the index of the interval (-1 for none) and whether
+        it is touched by this position
+        """
+        first=min(bisect.bisect_right(self.m_index_max_end,a_x),self.m_index_L)
+        last=bisect.bisect_left(self.m_index_min_begin,a_x)
+        for k in range(first,last):
+            begin=self.m_index_begin[k]
+            if begin<a_x<self.m_index_end[k] and not a_touched>>k&1:
+                return k,True
+            if begin==self.m_L and begin<a_x:
+                return k,False
+        return -1,False
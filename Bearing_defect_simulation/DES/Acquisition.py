@@ -1,37 +1,118 @@
 import sys
 import math
+import functools
 import numpy as np
-import streamlit as st
 from typing import Tuple
 
+
+def next_fast_len(a_n: int) -> int:
+    """
+    Smallest 5-smooth number (2^a 3^b 5^c) greater or equal to a_n, the FFT
+    is the fastest for these lengths
+    """
+    best = 1
+    while best < a_n:
+        best *= 2
+    power5 = 1
+    while power5 < best:
+        power35 = power5
+        while power35 < best:
+            length = power35
+            while length < a_n:
+                length *= 2
+            best = min(best, length)
+            power35 *= 3
+        power5 *= 5
+    return best
+
+
+@functools.lru_cache(maxsize=32)
+def get_frequency_axis(a_n: int, a_frequency: float) -> np.ndarray:
+    """
+    Frequencies of the first a_n // 2 bins of the FFT of a_n points sampled
+    at a_frequency (Hz), cached as every run of a simulation uses the same
+    """
+    frequencies = np.arange(a_n // 2) / (a_n / a_frequency)
+    frequencies.flags.writeable = False
+    return frequencies
+
+
+# Noise samples drawn at once by add_noise
+NOISE_CHUNK_LEN = 2 ** 16
+
+
+def add_noise(a_waveform: np.ndarray, a_generator: np.random.Generator, a_scale: float):
+    """
+    Add Gaussian noise of standard deviation a_scale to a_waveform in place.
+    The noise is drawn by chunks in the dtype of the waveform (float32 or
+    float64) without a temporary of the size of the waveform. For float64
+    the values are the ones of a_generator.normal(0, a_scale, a_waveform.size)
+    """
+    a_waveform = a_waveform.reshape(-1)
+    buffer = np.empty(min(NOISE_CHUNK_LEN, a_waveform.size), dtype=a_waveform.dtype)
+    for first in range(0, a_waveform.size, NOISE_CHUNK_LEN):
+        chunk = buffer[:min(NOISE_CHUNK_LEN, a_waveform.size - first)]
+        a_generator.standard_normal(out=chunk, dtype=chunk.dtype)
+        chunk *= a_scale
+        a_waveform[first:first + chunk.size] += chunk
+    return a_waveform
+
+
 class Acquisition(object):
     """
     Acquisition class, represents the simulation time discretization
     """
-    def __init__(self, a_duration: float = 1, a_frequency: float = 20000, a_noise: float = 0.1):
+    def __init__(self, a_duration: float = 1, a_frequency: float = 20000, a_noise: float = 0.1,
+                 a_allocate: bool = True, a_dtype=np.float64):
         self.m_duration = a_duration  # Duration of the acquisition in (s)
         self.m_frequency = a_frequency  # Frequency of acquisition in (Hz)
         self.m_dt = 1 / a_frequency  # Time between 2 sampling points 1/m_frequency (s)
         self.m_noise = a_noise  # Noise parameter in the waveform
+        # float64, or float32 for half the memory and bandwidth of the
+        # waveform, the noise and the spectrum (peaks within a bin, see
+        # test/precision_validation.py)
+        self.m_dtype = np.dtype(a_dtype)
+        if self.m_dtype not in (np.float32, np.float64):
+            raise ValueError(f"Unsupported dtype {self.m_dtype}, expected float32 or float64")
         # Attributes related to the vibration signal
         self.m_waveform_len = round(self.m_duration * self.m_frequency)
-        self.m_waveform = np.zeros(self.m_waveform_len)
+        # Streaming simulations (Simulation.stream) do not need the waveform
+        self.m_waveform = np.zeros(self.m_waveform_len if a_allocate else 0,
+                                   dtype=self.m_dtype)
         self.m_spectrum = np.array([])
 
-    def get_fft(self):
+    def get_time_axis(self) -> np.ndarray:
+        """
+        Time of every sample from 0 to the duration. Only built when asked
+        for, it is as large as the waveform. Always float64: float32 has 24
+        bits of mantissa, its steps of a long acquisition are not increasing
+        """
+        return np.linspace(0, self.m_duration, self.m_waveform_len)
+
+    def get_fft(self, a_fmin: float = 0.0, a_fmax: float = None, a_pad: bool = False):
         """Generate and return the FFT of the waveform."""
-        self.m_spectrum = self.generate_fft()
+        self.m_spectrum = self.generate_fft(a_fmin, a_fmax, a_pad)
         return self.m_spectrum
 
-    def generate_fft(self):
-        """Generate the FFT of the waveform."""
-        fourierTransform = np.fft.fft(self.m_waveform) / len(self.m_waveform)  # Normalize amplitude
-        fourierTransform = fourierTransform[range(int(len(self.m_waveform) / 2))]  # Exclude sampling frequency
-        tpCount = len(self.m_waveform)
-        values = np.arange(int(tpCount / 2))
-        timePeriod = tpCount / self.m_frequency
-        frequencies = values / timePeriod
-        return (frequencies, abs(fourierTransform))
+    def generate_fft(self, a_fmin: float = 0.0, a_fmax: float = None, a_pad: bool = False):
+        """
+        Generate the amplitude spectrum of the waveform with a real FFT, the
+        bins from 0 to the sampling frequency / 2 (excluded). a_fmin and a_fmax
+        (Hz, a_fmax excluded) limit the returned bins. a_pad zero-pads the
+        waveform to the next 5-smooth length, faster to transform and with
+        finer bins; the amplitude is still normalized by the waveform length.
+        The spectrum has the dtype of the waveform
+        """
+        n = len(self.m_waveform)
+        n_fft = next_fast_len(n) if a_pad else n
+        frequencies = get_frequency_axis(n_fft, self.m_frequency)
+        resolution = self.m_frequency / n_fft
+        first = min(max(0, math.ceil(a_fmin / resolution)), len(frequencies))
+        last = len(frequencies) if a_fmax is None \
+            else min(max(first, math.ceil(a_fmax / resolution)), len(frequencies))
+        spectrum = np.abs(np.fft.rfft(self.m_waveform, n=n_fft)[first:last])
+        spectrum /= n  # Normalize amplitude
+        return (frequencies[first:last], spectrum)
 
     def get_info(self):
         """Display information about the acquisition parameters using Streamlit."""
@@ -44,27 +125,21 @@ class Acquisition(object):
 
     def debug_waveform(self):
         """Print some debugging information about the waveform."""
-        st.write(f"Waveform sample data (first 10 points): {self.m_waveform[:10]}")
-        st.write(f"Waveform last 10 points: {self.m_waveform[-10:]}")
+        from Bearing_defect_simulation.DES import Report
+        Report.write(f"Waveform sample data (first 10 points): {self.m_waveform[:10]}")
+        Report.write(f"Waveform last 10 points: {self.m_waveform[-10:]}")
 
     def plot_waveform(self):
         """Plot the time-domain waveform using Streamlit."""
-        fig, ax = plt.subplots()
-        ax.plot(np.arange(self.m_waveform_len) * self.m_dt, self.m_waveform)
-        ax.set_title("Time Domain Waveform")
-        ax.set_xlabel("Time (s)")
-        ax.set_ylabel("Amplitude")
-        st.pyplot(fig)
+        from Bearing_defect_simulation.DES import Plot, Report
+        Report.show_figure(Plot.waveform_figure(
+            np.arange(self.m_waveform_len) * self.m_dt, self.m_waveform))
 
     def plot_spectrum(self):
         """Plot the frequency-domain spectrum using Streamlit."""
-        if self.m_spectrum.size == 0:
-            st.write("Error: Spectrum is empty. Please compute FFT first.")
+        from Bearing_defect_simulation.DES import Plot, Report
+        if len(self.m_spectrum) == 0:
+            Report.write("Error: Spectrum is empty. Please compute FFT first.")
         else:
             freq, spectrum = self.m_spectrum
-            fig, ax = plt.subplots()
-            ax.plot(freq, spectrum)
-            ax.set_title("Frequency Domain Spectrum")
-            ax.set_xlabel("Frequency (Hz)")
-            ax.set_ylabel("Amplitude")
-            st.pyplot(fig)
+            Report.show_figure(Plot.spectrum_figure(freq, spectrum))
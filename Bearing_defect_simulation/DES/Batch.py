@@ -0,0 +1,101 @@
+import itertools
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+
+from Bearing_defect_simulation.Bearing.Bearing import Bearing
+from Bearing_defect_simulation.DES.Acquisition import Acquisition
+from Bearing_defect_simulation.DES.Simulation import Simulation
+from Bearing_defect_simulation.DES.Presets import get_preset, parse_profile, \
+        split_preset
+
+
+def expand_sweep(a_sweep) -> list:
+    """
+    Expand a sweep specification into a list of parameter dicts. The sweep is
+    either a list of parameter dicts, used as is, or a grid: a dict mapping
+    each parameter to the list of its values. The grid is expanded in a
+    stable order, the last parameter varying the fastest
+    """
+    if isinstance(a_sweep, dict):
+        names = list(a_sweep)
+        return [dict(zip(names, values))
+                for values in itertools.product(*(a_sweep[k] for k in names))]
+    return [dict(params) for params in a_sweep]
+
+
+def get_seed(a_seed_sequence: np.random.SeedSequence) -> int:
+    """
+    128-bit integer seed drawn from a SeedSequence, the seed stored with a
+    simulation (see Dataset) to simulate it again with default_rng(seed)
+    """
+    high, low = a_seed_sequence.generate_state(2, np.uint64)
+    return int(high) << 64 | int(low)
+
+
+def run_one(a_params: dict, a_engine: str = 'vectorized') -> np.ndarray:
+    """
+    Run a single headless simulation (no streamlit, no banner) and return its
+    waveform. a_params holds Bearing and Acquisition keyword arguments and
+    optionally the 'seed' of the noise
+    """
+    bearing_kwargs, acquisition_kwargs = split_preset(a_params)
+    my_simulation = Simulation(Bearing(**bearing_kwargs),
+                               Acquisition(**acquisition_kwargs),
+                               a_engine=a_engine, a_verbose=False,
+                               a_seed=a_params.get("seed"))
+    my_simulation.start()
+    return my_simulation.m_acquisition.m_waveform
+
+
+class Batch(object):
+    """
+    Run a sweep of simulations over a pool of processes
+    """
+    def __init__(self, a_sweep, a_base: str = 'Custom',
+                 a_engine: str = 'vectorized', a_max_workers: int = None,
+                 a_chunksize: int = 1, a_seed: int = None):
+        self.m_engine = a_engine
+        self.m_max_workers = a_max_workers  # None uses all the cores
+        self.m_chunksize = a_chunksize  # Simulations sent at once to a worker
+        # Resolve every simulation parameters: the base preset updated with
+        # the swept values, so the results can be matched to their inputs
+        self.m_params = []
+        sweep = expand_sweep(a_sweep)
+        # Each simulation without seed gets an independent noise stream, a
+        # child of the SeedSequence of the batch. The seeds are drawn here and
+        # not in the workers, so they do not depend on the scheduling and the
+        # whole batch is reproduced from m_seed
+        seed_sequence = np.random.SeedSequence(a_seed)
+        self.m_seed = seed_sequence.entropy
+        children = iter(seed_sequence.spawn(len(sweep)))
+        for sweep_params in sweep:
+            params = get_preset(a_base)
+            params.update(sweep_params)
+            params["a_lambda"] = parse_profile(params["a_lambda"])
+            params["a_delta"] = parse_profile(params["a_delta"])
+            params["a_N"] = len(params["a_lambda"])
+            child = next(children)
+            if params.get("seed") is None:
+                params["seed"] = get_seed(child)
+            self.m_params.append(params)
+
+    def run(self) -> list:
+        """
+        Run all the simulations and return their waveforms in the order of
+        m_params
+        """
+        return list(self.run_iter())
+
+    def run_iter(self):
+        """
+        Run all the simulations and yield their waveforms in the order of
+        m_params as soon as they are available, e.g. to write them to a
+        dataset without holding the whole sweep in memory
+        """
+        engines = itertools.repeat(self.m_engine)
+        if self.m_max_workers == 1:
+            yield from map(run_one, self.m_params, engines)
+            return
+        with ProcessPoolExecutor(max_workers=self.m_max_workers) as executor:
+            yield from executor.map(run_one, self.m_params, engines,
+                                    chunksize=self.m_chunksize)
@@ -0,0 +1,194 @@
+import os
+import json
+import hashlib
+import zipfile
+import tempfile
+import numpy as np
+from collections import OrderedDict
+
+from Bearing_defect_simulation.Bearing.Bearing import Bearing
+from Bearing_defect_simulation.DES.Acquisition import Acquisition
+from Bearing_defect_simulation.DES.Instrumentation import Instrumentation
+from Bearing_defect_simulation.DES.Simulation import Simulation
+from Bearing_defect_simulation.DES.Presets import BEARING_KEYS, \
+        ACQUISITION_KEYS, parse_profile, split_preset
+
+DEFAULT_PATH = os.path.join(os.path.expanduser("~"), ".cache",
+                            "bearing_defect_simulation")
+
+
+def normalize_params(a_params: dict) -> dict:
+    """
+    Parameters reduced to what changes the result, with a single type per
+    value (2000 and 2000.0 are the same rpm, profiles are lists of floats)
+    """
+    normalized = {}
+    for key in BEARING_KEYS + ACQUISITION_KEYS:
+        if key == "a_dtype":
+            # Optional, the runs without it are float64
+            normalized[key] = np.dtype(a_params.get(key, np.float64)).name
+            continue
+        value = a_params[key]
+        if key in ("a_lambda", "a_delta"):
+            normalized[key] = parse_profile(value).tolist()
+        elif isinstance(value, str):
+            normalized[key] = value
+        else:
+            normalized[key] = float(value)
+    seed = a_params.get("seed")
+    normalized["seed"] = None if seed is None else int(seed)
+    return normalized
+
+
+def get_key(a_params: dict, a_engine: str, a_clean: bool = False) -> str:
+    """
+    Content address of a simulation: hash of its normalized parameters. With
+    a_clean, address of its noise-free waveform, which does not depend on
+    the noise level and seed
+    """
+    normalized = normalize_params(a_params)
+    normalized["engine"] = a_engine
+    if a_clean:
+        del normalized["a_noise"], normalized["seed"]
+    text = json.dumps(normalized, sort_keys=True)
+    return hashlib.sha256(text.encode()).hexdigest()
+
+
+class ResultCache(object):
+    """
+    Cache of simulation results (tuples of arrays: the waveform and its
+    spectrum, or a noise-free waveform) by content address.
+    The results are kept in memory up to a_max_items / a_max_bytes, least
+    recently used first out, and on disk in a_path (None disables the disk)
+    up to a_max_disk_bytes. Only seeded runs should be cached, a run without
+    seed has a different noise every time
+    """
+    def __init__(self, a_max_items: int = 16, a_max_bytes: int = 256 * 2 ** 20,
+                 a_path: str = DEFAULT_PATH, a_max_disk_bytes: int = 2 ** 30):
+        self.m_max_items = a_max_items
+        self.m_max_bytes = a_max_bytes
+        self.m_path = a_path
+        self.m_max_disk_bytes = a_max_disk_bytes
+        self.m_memory = OrderedDict()
+        self.m_bytes = 0
+        if self.m_path is not None:
+            os.makedirs(self.m_path, exist_ok=True)
+
+    def get(self, a_key: str):
+        """Return the cached tuple of arrays or None"""
+        if a_key in self.m_memory:
+            self.m_memory.move_to_end(a_key)
+            return self.m_memory[a_key]
+        if self.m_path is None:
+            return None
+        file_name = os.path.join(self.m_path, a_key + ".npz")
+        try:
+            with np.load(file_name) as data:
+                result = tuple(data[name] for name in data.files)
+        except (OSError, KeyError, ValueError, EOFError, zipfile.BadZipFile):
+            # Missing, or torn by a crash: a miss, rewritten by the next put
+            return None
+        try:
+            os.utime(file_name)  # Most recently used on disk as well
+        except FileNotFoundError:
+            pass  # Evicted by another process since it was read
+        self.put_memory(a_key, result)
+        return result
+
+    def put(self, a_key: str, *a_arrays: np.ndarray):
+        result = tuple(a_arrays)
+        self.put_memory(a_key, result)
+        if self.m_path is not None:
+            # Written under a temporary name so readers never see half a file,
+            # unique as processes of a JobService can write the same key
+            file_name = os.path.join(self.m_path, a_key + ".npz")
+            handle, temp_name = tempfile.mkstemp(suffix=".tmp.npz", prefix=a_key,
+                                                 dir=self.m_path)
+            try:
+                with os.fdopen(handle, "wb") as f:
+                    np.savez(f, *result)
+                os.replace(temp_name, file_name)
+            except BaseException:
+                os.remove(temp_name)
+                raise
+            self.evict_disk()
+
+    def put_memory(self, a_key: str, a_result: tuple):
+        if a_key in self.m_memory:
+            self.m_bytes -= sum(a.nbytes for a in self.m_memory.pop(a_key))
+        self.m_memory[a_key] = a_result
+        self.m_bytes += sum(a.nbytes for a in a_result)
+        while len(self.m_memory) > 1 and (len(self.m_memory) > self.m_max_items
+                                          or self.m_bytes > self.m_max_bytes):
+            key, result = self.m_memory.popitem(last=False)
+            self.m_bytes -= sum(a.nbytes for a in result)
+
+    def evict_disk(self):
+        """
+        Remove the least recently used files above a_max_disk_bytes. The
+        processes of a JobService evict concurrently, a file another one
+        removed first is skipped
+        """
+        entries = []
+        for entry in os.scandir(self.m_path):
+            if entry.name.endswith(".npz") and not entry.name.endswith(".tmp.npz"):
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+        total = sum(size for mtime, size, path in entries)
+        for mtime, size, path in sorted(entries):
+            if total <= self.m_max_disk_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+
+    def clear(self):
+        self.m_memory.clear()
+        self.m_bytes = 0
+        if self.m_path is not None:
+            for entry in os.scandir(self.m_path):
+                if entry.name.endswith(".npz"):
+                    try:
+                        os.remove(entry.path)
+                    except FileNotFoundError:
+                        pass
+
+
+def run_cached(a_cache: ResultCache, a_params: dict, a_engine: str = 'vectorized',
+               a_instrumentation: Instrumentation = None):
+    """
+    Waveform and spectrum of a seeded simulation through a_cache, by stages.
+    The noise-free waveform is cached on its own, so when only the noise
+    level or the seed change the pass engine is not run again: the noise is
+    added to the cached waveform, giving the waveform of Simulation.start.
+    Returns the waveform, the spectrum and the first stage that had to run:
+    'simulation', 'noise' or None when the result was cached
+    """
+    key = get_key(a_params, a_engine)
+    cached = a_cache.get(key)
+    if cached is not None:
+        return cached[0], cached[1], None
+    bearing_kwargs, acquisition_kwargs = split_preset(a_params)
+    my_acquisition = Acquisition(**acquisition_kwargs)
+    my_simulation = Simulation(Bearing(**bearing_kwargs), my_acquisition,
+                               a_engine=a_engine, a_verbose=False,
+                               a_seed=a_params.get("seed"),
+                               a_instrumentation=a_instrumentation)
+    clean_key = get_key(a_params, a_engine, a_clean=True)
+    clean = a_cache.get(clean_key)
+    if clean is None:
+        stage = 'simulation'
+        my_simulation.run_pulses()
+        a_cache.put(clean_key, my_acquisition.m_waveform.copy())
+    else:
+        stage = 'noise'
+        my_acquisition.m_waveform[:] = clean[0]
+    my_simulation.run_noise()
+    spectrum = my_acquisition.get_fft()[1]
+    a_cache.put(key, my_acquisition.m_waveform, spectrum)
+    return my_acquisition.m_waveform, spectrum, stage
@@ -0,0 +1,186 @@
+import os
+import json
+import numpy as np
+
+from Bearing_defect_simulation.DES.Simulation import ENGINES
+from Bearing_defect_simulation.DES.Batch import run_one
+
+# A dataset is a folder holding 3 append-only files:
+#   - signals.f32: the waveforms one after the other, float32
+#   - profiles.f64: the lambda then delta profile of each defect, float64 so
+#     the signals can be simulated again exactly
+#   - meta.bin: one META_DTYPE record per signal
+# A signal is only part of the dataset once its metadata record is written,
+# so a run interrupted while writing a waveform leaves a consistent dataset.
+SIGNALS_FILE = "signals.f32"
+PROFILES_FILE = "profiles.f64"
+META_FILE = "meta.bin"
+FORMAT_FILE = "format.json"
+FORMAT_VERSION = 1
+
+META_DTYPE = np.dtype([
+    ("offset", "<i8"), ("length", "<i8"),  # Position in signals.f32 (samples)
+    ("frequency", "<f8"), ("duration", "<f8"), ("noise", "<f8"),
+    ("n", "<i4"), ("dP", "<f8"), ("dB", "<f8"), ("theta", "<f8"),
+    ("rpm", "<f8"), ("outer_race", "u1"), ("L", "<f8"), ("N", "<i4"),
+    ("profile_offset", "<i8"),  # Position in profiles.f64 (values)
+    ("engine", "u1"),  # Index in Simulation.ENGINES
+    ("seeded", "u1"), ("seed", "<u8", (2,)),  # Seed as (high, low) 64 bits
+    ("single", "u1"),  # Simulated in float32 (Acquisition a_dtype)
+])
+
+
+def split_seed(a_seed):
+    # The seeds drawn from SeedSequence have 128 bits
+    if a_seed is None:
+        return 0, (0, 0)
+    a_seed = int(a_seed)
+    return 1, (a_seed >> 64, a_seed & 0xFFFFFFFFFFFFFFFF)
+
+
+class DatasetWriter(object):
+    """
+    Append simulated signals with their parameters to a dataset folder
+    """
+    def __init__(self, a_path: str):
+        self.m_path = a_path
+        os.makedirs(a_path, exist_ok=True)
+        format_path = os.path.join(a_path, FORMAT_FILE)
+        if not os.path.exists(format_path):
+            with open(format_path, "w") as f:
+                json.dump({"version": FORMAT_VERSION,
+                           "meta_dtype": META_DTYPE.descr}, f)
+        self.m_signals = open(os.path.join(a_path, SIGNALS_FILE), "ab")
+        self.m_profiles = open(os.path.join(a_path, PROFILES_FILE), "ab")
+        self.m_meta = open(os.path.join(a_path, META_FILE), "ab")
+        # Append after what is already in the files
+        self.m_n_signals = self.m_meta.seek(0, os.SEEK_END) // META_DTYPE.itemsize
+        self.m_offset = self.m_signals.seek(0, os.SEEK_END) // 4
+        self.m_profile_offset = self.m_profiles.seek(0, os.SEEK_END) // 8
+
+    def append(self, a_waveform, a_params: dict, a_engine: str = 'vectorized') -> int:
+        """
+        Append a signal, a_waveform is either an array or an iterable of
+        blocks (e.g. Simulation.stream) written as they come. a_params holds
+        the Bearing and Acquisition keyword arguments and the 'seed' of the
+        noise. Returns the index of the signal in the dataset
+        """
+        blocks = [a_waveform] if isinstance(a_waveform, np.ndarray) else a_waveform
+        length = 0
+        for block in blocks:
+            block = np.asarray(block, dtype="<f4")
+            self.m_signals.write(block.tobytes())
+            length += block.size
+        self.m_signals.flush()
+        profile = np.concatenate((np.asarray(a_params["a_lambda"], dtype="<f8"),
+                                  np.asarray(a_params["a_delta"], dtype="<f8")))
+        self.m_profiles.write(profile.tobytes())
+        self.m_profiles.flush()
+
+        record = np.zeros(1, dtype=META_DTYPE)
+        record["offset"] = self.m_offset
+        record["length"] = length
+        record["frequency"] = a_params["a_frequency"]
+        record["duration"] = a_params["a_duration"]
+        record["noise"] = a_params["a_noise"]
+        record["n"] = a_params["a_n"]
+        record["dP"] = a_params["a_dP"]
+        record["dB"] = a_params["a_dB"]
+        record["theta"] = a_params["a_theta"]
+        record["rpm"] = a_params["a_rpm"]
+        record["outer_race"] = a_params["a_race"] == "outer"
+        record["L"] = a_params["a_L"]
+        record["N"] = len(a_params["a_lambda"])
+        record["profile_offset"] = self.m_profile_offset
+        record["engine"] = ENGINES.index(a_engine)
+        record["seeded"], record["seed"] = split_seed(a_params.get("seed"))
+        record["single"] = np.dtype(a_params.get("a_dtype", np.float64)) == np.float32
+        self.m_meta.write(record.tobytes())
+        self.m_meta.flush()
+
+        self.m_offset += length
+        self.m_profile_offset += profile.size
+        self.m_n_signals += 1
+        return self.m_n_signals - 1
+
+    def close(self):
+        for f in (self.m_signals, self.m_profiles, self.m_meta):
+            f.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *a_exc):
+        self.close()
+
+
+class DatasetReader(object):
+    """
+    Random-access and sequential reader of a dataset folder. The signals are
+    float32 views into the memory-mapped file, nothing is parsed or copied.
+    Signals appended after the reader was opened are not seen
+    """
+    def __init__(self, a_path: str):
+        self.m_path = a_path
+        self.m_meta = self.open_memmap(META_FILE, META_DTYPE)
+        self.m_signals = self.open_memmap(SIGNALS_FILE, np.dtype("<f4"))
+        self.m_profiles = self.open_memmap(PROFILES_FILE, np.dtype("<f8"))
+
+    def open_memmap(self, a_file: str, a_dtype: np.dtype) -> np.ndarray:
+        path = os.path.join(self.m_path, a_file)
+        size = os.path.getsize(path) // a_dtype.itemsize
+        if size == 0:  # np.memmap cannot map an empty file
+            return np.zeros(0, dtype=a_dtype)
+        return np.memmap(path, dtype=a_dtype, mode="r", shape=(size,))
+
+    def __len__(self) -> int:
+        return len(self.m_meta)
+
+    def __getitem__(self, a_index: int) -> np.ndarray:
+        record = self.m_meta[a_index]
+        return self.m_signals[record["offset"]:record["offset"] + record["length"]]
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+    def get_time(self, a_index: int) -> np.ndarray:
+        record = self.m_meta[a_index]
+        return np.arange(record["length"]) / record["frequency"]
+
+    def get_params(self, a_index: int) -> dict:
+        """
+        Parameters of a signal, as Bearing and Acquisition keyword arguments
+        plus its 'seed' and 'engine', enough to simulate it again
+        """
+        record = self.m_meta[a_index]
+        N = int(record["N"])
+        profile = self.m_profiles[record["profile_offset"]:
+                                  record["profile_offset"] + 2 * N]
+        return {
+            "a_n": int(record["n"]), "a_dP": float(record["dP"]),
+            "a_race": "outer" if record["outer_race"] else "inner",
+            "a_rpm": float(record["rpm"]), "a_dB": float(record["dB"]),
+            "a_theta": float(record["theta"]), "a_L": float(record["L"]),
+            "a_N": N, "a_lambda": np.array(profile[:N]),
+            "a_delta": np.array(profile[N:]),
+            "a_duration": float(record["duration"]),
+            "a_frequency": float(record["frequency"]),
+            "a_noise": float(record["noise"]),
+            "seed": (int(record["seed"][0]) << 64 | int(record["seed"][1]))
+                    if record["seeded"] else None,
+            "a_dtype": "float32" if record["single"] else "float64",
+            "engine": ENGINES[record["engine"]],
+        }
+
+    def regenerate(self, a_index: int) -> np.ndarray:
+        """
+        Simulate a signal again from its parameters and seed. The result is
+        the waveform (float64, or float32 for float32 simulations) the stored
+        float32 signal was written from, bit for bit, so a dataset can keep
+        only the parameters of its signals
+        """
+        params = self.get_params(a_index)
+        if params["seed"] is None:
+            raise ValueError(f"Signal {a_index} was stored without its seed")
+        return run_one(params, params.pop("engine"))
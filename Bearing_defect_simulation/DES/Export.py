@@ -0,0 +1,98 @@
+import io
+import numpy as np
+
+# Download formats: file name and mime type
+FORMATS = {
+    "csv": ("signal.csv", "text/csv"),
+    "txt": ("signal.txt", "text/plain"),
+    "mat": ("signal.mat", "application/octet-stream"),
+    "npy": ("signal.npy", "application/octet-stream"),
+}
+# Rows serialized at once by the text formats
+CHUNK_ROWS = 2 ** 16
+
+
+def get_txt_format(a_values: np.ndarray) -> str:
+    # The 9 significant digits of a float32 for float32 values
+    return "%.8e" if a_values.dtype == np.float32 else "%.18e"
+
+
+def iter_rows(a_time: np.ndarray, a_signal: np.ndarray, a_row: str,
+              a_shortest: bool = False):
+    """
+    Serialize the (time, signal) rows chunk by chunk, each chunk is formatted
+    with a single % operation instead of one call per row. With a_shortest
+    the values are given to a_row as the shortest strings giving them back
+    in the dtype of their column, e.g. 9 digits at most for a float32 signal
+    rather than the 17 of its float64 conversion
+    """
+    for first in range(0, len(a_time), CHUNK_ROWS):
+        columns = [a_time[first:first + CHUNK_ROWS],
+                   a_signal[first:first + CHUNK_ROWS]]
+        values = np.empty(2 * len(columns[0]), dtype=object)
+        for k, column in enumerate(columns):
+            values[k::2] = (column.astype(str) if a_shortest else column).tolist()
+        yield ((a_row * len(columns[0])) % tuple(values.tolist())).encode()
+
+
+def iter_csv(a_time: np.ndarray, a_signal: np.ndarray):
+    # The repr of every value in the dtype of its column
+    yield b"Time,Amplitude\n"
+    yield from iter_rows(a_time, a_signal, "%s,%s\n", a_shortest=True)
+
+
+def iter_txt(a_time: np.ndarray, a_signal: np.ndarray):
+    # Same layout as np.savetxt(header="Time Amplitude", comments=''), the
+    # digits of each column following its dtype
+    yield b"Time Amplitude\n"
+    row = f"{get_txt_format(a_time)} {get_txt_format(a_signal)}\n"
+    yield from iter_rows(a_time, a_signal, row)
+
+
+def iter_npy(a_time: np.ndarray, a_signal: np.ndarray):
+    # Same file as np.save(np.column_stack((time, signal))), without the copy:
+    # float64 as the time axis
+    header = io.BytesIO()
+    np.lib.format.write_array_header_1_0(header, {
+        "descr": np.lib.format.dtype_to_descr(np.result_type(a_time, a_signal)),
+        "fortran_order": False, "shape": (len(a_time), 2)})
+    yield header.getvalue()
+    for first in range(0, len(a_time), CHUNK_ROWS):
+        yield np.column_stack((a_time[first:first + CHUNK_ROWS],
+                               a_signal[first:first + CHUNK_ROWS])).tobytes()
+
+
+def iter_mat(a_time: np.ndarray, a_signal: np.ndarray):
+    import scipy.io
+    buf = io.BytesIO()
+    scipy.io.savemat(buf, {"time": a_time, "signal": a_signal})
+    yield buf.getvalue()
+
+
+ITERATORS = {"csv": iter_csv, "txt": iter_txt, "mat": iter_mat, "npy": iter_npy}
+
+
+class Export(object):
+    """
+    Lazy export of the results of one run: a format is only serialized the
+    first time it is requested, then kept for the next requests
+    """
+    def __init__(self, a_time: np.ndarray, a_signal: np.ndarray):
+        self.m_time = a_time
+        self.m_signal = a_signal
+        self.m_cache = {}
+
+    def get(self, a_format: str) -> bytes:
+        if a_format not in self.m_cache:
+            self.m_cache[a_format] = b"".join(
+                ITERATORS[a_format](self.m_time, self.m_signal))
+        return self.m_cache[a_format]
+
+    def save(self, a_format: str, a_file_name: str):
+        """Write a format to disk chunk by chunk"""
+        with open(a_file_name, "wb") as f:
+            if a_format in self.m_cache:
+                f.write(self.m_cache[a_format])
+            else:
+                for chunk in ITERATORS[a_format](self.m_time, self.m_signal):
+                    f.write(chunk)
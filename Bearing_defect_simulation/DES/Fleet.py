@@ -0,0 +1,152 @@
+import math
+import numpy as np
+
+from Bearing_defect_simulation.Bearing.Defect import Defect
+from Bearing_defect_simulation.DES.Acquisition import Acquisition, add_noise
+
+
+class Fleet(object):
+    """
+    Many bearings simulated at once on the same acquisition grid. Every
+    bearing parameter is either a scalar shared by the fleet or an array with
+    one value per bearing. The defect profiles are either shared (1D) or one
+    row per bearing (2D). Each row of the result is the waveform given by
+    Simulation with the 'template' engine for the same bearing
+    """
+    def __init__(self, a_acquisition: Acquisition, a_n=16, a_dP=71.501,
+                 a_race='outer', a_rpm=2000, a_dB=8.4074, a_theta=15.17,
+                 a_L=3.8, a_lambda=[0.7,0.7,0.8,0.8,0.8],
+                 a_delta=[0.5,0,0.5,0,0.7], a_seed=None):
+        self.m_acquisition = a_acquisition
+        # Seed of the noise as in Simulation, drawn when not given
+        if a_seed is None:
+            a_seed = np.random.SeedSequence().entropy
+        self.m_seed = a_seed
+        self.m_gamma = 10
+        n, dP, rpm, dB, theta, L, race = np.broadcast_arrays(
+            np.asarray(a_n), np.asarray(a_dP, dtype=float),
+            np.asarray(a_rpm, dtype=float), np.asarray(a_dB, dtype=float),
+            np.asarray(a_theta, dtype=float), np.asarray(a_L, dtype=float),
+            np.asarray(a_race))
+        if n.ndim > 1:
+            raise ValueError("Fleet parameters should be scalars or 1D arrays")
+        n_profiles = len(a_lambda) if np.ndim(a_lambda) == 2 else 1
+        shape = np.broadcast_shapes(n.shape or (1,), (n_profiles,))
+        self.m_n_bearings = shape[0]
+        self.m_n = np.broadcast_to(n, shape)
+        self.m_dP = np.broadcast_to(dP, shape)
+        self.m_rpm = np.broadcast_to(rpm, shape) / 60  # (rev/min)->(rev/s)
+        self.m_dB = np.broadcast_to(dB, shape)
+        self.m_L = np.broadcast_to(L, shape)
+        race = np.broadcast_to(race, shape)
+        if not np.all((race == 'outer') | (race == 'inner')):
+            raise ValueError("Race should be either 'inner' or 'outer'")
+        self.m_outerRace = race == 'outer'
+        self.m_theta = np.broadcast_to(theta, shape) * math.pi / 180
+        # Same expression as Bearing.m_duration, including the cosine of the
+        # contact angle taken in degrees
+        self.m_duration = 2 * self.m_L * self.m_dP / (self.m_rpm * math.pi
+                * (self.m_dP ** 2 - (self.m_dB * np.cos(theta)) ** 2))
+        self.m_duration_between_ball = 1 / self.get_BPFO_freq()
+        frequency = np.where(self.m_outerRace, self.get_BPFO_freq(),
+                             self.get_BPFI_freq())
+        self.m_n_ball_to_pass = np.round(a_acquisition.m_duration
+                                         * frequency).astype(np.int64)
+        self.m_lambda = np.broadcast_to(np.atleast_2d(
+            np.asarray(a_lambda, dtype=float)), shape + (np.shape(a_lambda)[-1],))
+        self.m_delta = np.broadcast_to(np.atleast_2d(
+            np.asarray(a_delta, dtype=float)), self.m_lambda.shape)
+        self.m_waveforms = np.array([])
+
+    def get_BPFO_freq(self):
+        return self.m_n / 2 * self.m_rpm \
+            * (1 - self.m_dB / self.m_dP * np.cos(self.m_theta))
+
+    def get_BPFI_freq(self):
+        return self.m_n / 2 * self.m_rpm \
+            * (1 + self.m_dB / self.m_dP * np.cos(self.m_theta))
+
+    def get_filtered_intervals(self):
+        """
+        Filtered intervals of every bearing as (n_bearings, K) arrays of
+        begin position, width and amplitude, padded with intervals that are
+        never hit. The filtering is done once per distinct profile: it does
+        not depend on L, so a sweep of L filters a single profile
+        """
+        profiles = np.column_stack((self.m_lambda, self.m_delta))
+        unique, first, inverse = np.unique(profiles, axis=0, return_index=True,
+                                           return_inverse=True)
+        N = self.m_lambda.shape[1]
+        defects = [Defect(self.m_L[i], N, p[:N], p[N:])
+                   for p, i in zip(unique, first)]
+        K = max(len(d.m_x_pos_filtered) for d in defects)
+        begins = np.full((len(defects), K), np.inf)
+        widths = np.zeros((len(defects), K))
+        amplitudes = np.zeros((len(defects), K))
+        for u, d in enumerate(defects):
+            k = len(d.m_x_pos_filtered)
+            begins[u, :k] = d.m_x_pos_filtered
+            widths[u, :k] = d.m_lambda_filtered
+            # Same computation as Simulation.get_amplitude
+            amplitudes[u, :k] = self.m_gamma * np.append(
+                d.m_x_pos_filtered[:1], d.m_x_pos_filtered[1:]
+                - (d.m_x_pos_filtered[:-1] + d.m_lambda_filtered[:-1]))
+        inverse = inverse.reshape(-1)
+        return begins[inverse], widths[inverse], amplitudes[inverse]
+
+    def get_pulse_templates(self):
+        """
+        Pulses of one passage for every bearing, as flat arrays of bearing
+        index, step in the defect (0 is the first step) and amplitude
+        """
+        dt = self.m_acquisition.m_dt
+        dx = dt / self.m_duration * self.m_L
+        n_run = np.ceil(self.m_duration / dt).astype(np.int64)
+        n_steps = int(n_run.max())
+        # Positions accumulated step by step as in RollingElement.advance
+        x = np.cumsum(np.broadcast_to(dx[:, None], (self.m_n_bearings, n_steps)),
+                      axis=1)
+        begins, widths, amplitudes = self.get_filtered_intervals()
+        hit = np.full(x.shape, -1)
+        rows = np.arange(self.m_n_bearings)
+        for k in range(begins.shape[1]):
+            begin = begins[:, k:k + 1]
+            inside = (hit < 0) & (begin < x) & (x < begin + widths[:, k:k + 1])
+            touched = inside.any(axis=1)
+            hit[rows[touched], np.argmax(inside, axis=1)[touched]] = k
+            at_L = (begins[:, k] == self.m_L)[:, None]
+            hit[(hit < 0) & at_L & (begin < x)] = k
+        hit[np.arange(n_steps) >= n_run[:, None]] = -1
+        bearing, step = np.nonzero(hit >= 0)
+        return bearing, step, amplitudes[bearing, hit[bearing, step]]
+
+    def start(self) -> np.ndarray:
+        """
+        Simulate the fleet, returns the (n_bearings, m_waveform_len) array of
+        the waveforms
+        """
+        acquisition = self.m_acquisition
+        length = acquisition.m_waveform_len
+        self.m_waveforms = np.zeros((self.m_n_bearings, length),
+                                    dtype=acquisition.m_dtype)
+        bearing, step, amplitude = self.get_pulse_templates()
+        # Repeat each pulse of the template for every pass of its bearing
+        counts = self.m_n_ball_to_pass[bearing]
+        pulse = np.repeat(np.arange(bearing.size), counts)
+        i = np.arange(pulse.size) - np.repeat(np.cumsum(counts) - counts, counts)
+        bearing = bearing[pulse]
+        index_enter = np.floor(i * self.m_duration_between_ball[bearing]
+                               / acquisition.m_dt).astype(np.int64)
+        position = index_enter + step[pulse] + 1
+        # Write in the pass order of the single bearing engine
+        order = np.lexsort((pulse, i, bearing))
+        keep = order[position[order] < length]
+        self.m_waveforms.reshape(-1)[bearing[keep] * length + position[keep]] = \
+            amplitude[pulse[keep]]
+        if self.m_n_bearings and length:
+            # One noise stream for the fleet, drawn row after row in place
+            scale = acquisition.m_noise * self.m_waveforms.max(axis=1)
+            generator = np.random.default_rng(self.m_seed)
+            for waveform, row_scale in zip(self.m_waveforms, scale):
+                add_noise(waveform, generator, row_scale)
+        return self.m_waveforms
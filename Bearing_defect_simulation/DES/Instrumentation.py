@@ -0,0 +1,74 @@
+import time
+import threading
+import contextlib
+import tracemalloc
+
+# Stage of a simulation run without instrumentation, does nothing
+NO_STAGE = contextlib.nullcontext()
+
+
+class Instrumentation(object):
+    """
+    Timings and counters of the stages of a simulation, given to Simulation
+    with a_instrumentation. Each stage records its total time, its number of
+    calls and, with a_memory, the peak of the memory allocated during the
+    stage (tracemalloc, which slows down python code). The hooks are called
+    as hook('begin', stage) and hook('end', stage) around every stage, e.g.
+    to enable an external profiler only while the engine runs
+    """
+    def __init__(self, a_hooks=(), a_memory: bool = False):
+        self.m_hooks = list(a_hooks)
+        self.m_memory = a_memory
+        self.m_timings = {}  # Total time of each stage (s)
+        self.m_calls = {}  # Number of calls of each stage
+        self.m_allocated = {}  # Peak memory allocated by each stage (bytes)
+        self.m_counters = {}  # Passes, samples written, intervals hit...
+        # The threads of the 'thread' engine count concurrently
+        self.m_lock = threading.Lock()
+
+    @contextlib.contextmanager
+    def stage(self, a_name: str):
+        for hook in self.m_hooks:
+            hook('begin', a_name)
+        if self.m_memory:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+            tracemalloc.reset_peak()
+            memory_start = tracemalloc.get_traced_memory()[0]
+        time_start = time.perf_counter()
+        try:
+            yield self
+        finally:
+            elapsed = time.perf_counter() - time_start
+            self.m_timings[a_name] = self.m_timings.get(a_name, 0.0) + elapsed
+            self.m_calls[a_name] = self.m_calls.get(a_name, 0) + 1
+            if self.m_memory:
+                allocated = tracemalloc.get_traced_memory()[1] - memory_start
+                self.m_allocated[a_name] = max(allocated,
+                                               self.m_allocated.get(a_name, 0))
+            for hook in reversed(self.m_hooks):
+                hook('end', a_name)
+
+    def count(self, a_name: str, a_value: int = 1):
+        with self.m_lock:
+            self.m_counters[a_name] = self.m_counters.get(a_name, 0) + a_value
+
+    def as_dict(self) -> dict:
+        """Timings, calls, memory and counters, e.g. to be saved as JSON"""
+        return {"timings": dict(self.m_timings), "calls": dict(self.m_calls),
+                "allocated": dict(self.m_allocated),
+                "counters": dict(self.m_counters)}
+
+    def get_report(self) -> str:
+        """Text table of the stages, in the order they first ran"""
+        total = sum(self.m_timings.values())
+        lines = [f"{'stage':12s} {'calls':>6s} {'time (s)':>10s} {'%':>6s}"
+                 + (f" {'memory (MB)':>12s}" if self.m_memory else "")]
+        for name, elapsed in self.m_timings.items():
+            line = f"{name:12s} {self.m_calls[name]:6d} {elapsed:10.4f} " \
+                   f"{100 * elapsed / total if total else 0:6.1f}"
+            if self.m_memory:
+                line += f" {self.m_allocated[name] / 2 ** 20:12.1f}"
+            lines.append(line)
+        lines += [f"{name}: {value}" for name, value in self.m_counters.items()]
+        return "\n".join(lines)
@@ -0,0 +1,162 @@
+import asyncio
+import threading
+import multiprocessing
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+
+from Bearing_defect_simulation.DES.Cache import ResultCache, get_key, run_cached
+from Bearing_defect_simulation.DES.Instrumentation import Instrumentation
+
+# States of a job, see JobService.get_status
+QUEUED = 'queued'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+
+
+class ProgressInstrumentation(Instrumentation):
+    """
+    Instrumentation of a job in a worker process, the number of passes
+    computed out of the passes of the simulation is written to the progress
+    dict shared with the service
+    """
+    def __init__(self, a_progress, a_key: str):
+        super().__init__()
+        self.m_progress = a_progress
+        self.m_key = a_key
+
+    def count(self, a_name: str, a_value: int = 1):
+        super().count(a_name, a_value)
+        if a_name in ('passes', 'passes_computed'):
+            self.m_progress[self.m_key] = (self.m_counters.get('passes_computed', 0),
+                                           self.m_counters.get('passes', 0))
+
+
+def run_job(a_params: dict, a_engine: str, a_cache_path: str, a_progress, a_key: str):
+    """
+    Run one job in a worker process. The noise-free waveform goes through
+    the disk cache of the service, so a job only changing the noise of a
+    previous one does not run the pass engine again
+    """
+    cache = ResultCache(a_max_items=1, a_path=a_cache_path)
+    return run_cached(cache, a_params, a_engine,
+                      ProgressInstrumentation(a_progress, a_key))
+
+
+class JobService(object):
+    """
+    Local service running simulations in a pool of processes without
+    blocking the caller, e.g. the script thread of the app. The jobs are
+    coroutines of an asyncio loop running in a thread of the service, each
+    awaiting its run in the pool. A job is identified by the content address
+    of its parameters (Cache.get_key): identical jobs submitted while one is
+    in flight share its run, finished jobs are kept in a_cache
+    (memory-only cache by default, see ResultCache)
+    """
+    def __init__(self, a_max_workers: int = None, a_cache: ResultCache = None,
+                 a_engine: str = 'vectorized'):
+        self.m_engine = a_engine
+        self.m_cache = a_cache if a_cache is not None else ResultCache(a_path=None)
+        # The service lives in a process with threads (the app server), so
+        # the workers are spawned rather than forked
+        context = multiprocessing.get_context('spawn')
+        self.m_executor = ProcessPoolExecutor(a_max_workers, mp_context=context)
+        self.m_manager = context.Manager()
+        self.m_progress = self.m_manager.dict()  # (passes computed, passes) by job
+        self.m_jobs = {}  # concurrent.futures.Future of every job in flight
+        self.m_stages = {}  # First stage run by every finished job not read yet
+        self.m_lock = threading.Lock()  # Guards m_jobs and m_cache
+        self.m_loop = asyncio.new_event_loop()
+        self.m_thread = threading.Thread(target=self.m_loop.run_forever, daemon=True)
+        self.m_thread.start()
+
+    def submit(self, a_params: dict) -> str:
+        """
+        Start a simulation job and return its id at once. a_params holds
+        Bearing and Acquisition keyword arguments and the 'seed' of the noise,
+        a job without seed is given one so its result can be cached
+        """
+        params = dict(a_params)
+        if params.get("seed") is None:
+            params["seed"] = np.random.SeedSequence().entropy
+        key = get_key(params, self.m_engine)
+        with self.m_lock:
+            future = self.m_jobs.get(key)
+            in_flight = future is not None and not (future.done() and future.exception())
+            if not in_flight and self.m_cache.get(key) is None:
+                self.m_jobs[key] = asyncio.run_coroutine_threadsafe(
+                    self.run(key, params), self.m_loop)
+        return key
+
+    async def run(self, a_key: str, a_params: dict):
+        loop = asyncio.get_running_loop()
+        try:
+            result = await loop.run_in_executor(
+                self.m_executor, run_job, a_params, self.m_engine,
+                self.m_cache.m_path, self.m_progress, a_key)
+        finally:
+            self.m_progress.pop(a_key, None)
+        with self.m_lock:
+            # The worker already wrote the result to the disk of the cache
+            self.m_cache.put_memory(a_key, result[:2])
+            self.m_stages[a_key] = result[2]
+            del self.m_jobs[a_key]
+        return result
+
+    def get_status(self, a_key: str) -> dict:
+        """
+        State of a job (queued, running, done or failed) and its progress:
+        the passes computed out of the m_n_ball_to_pass of the simulation
+        """
+        with self.m_lock:
+            future = self.m_jobs.get(a_key)
+            if future is None:
+                if self.m_cache.get(a_key) is None:
+                    raise KeyError(f"Unknown job {a_key}")
+                return {"state": DONE, "passes_computed": None, "passes": None}
+        if future.done():
+            if future.exception() is not None:
+                return {"state": FAILED, "passes_computed": None, "passes": None,
+                        "error": str(future.exception())}
+            return {"state": DONE, "passes_computed": None, "passes": None}
+        progress = self.m_progress.get(a_key)
+        if progress is None:
+            return {"state": QUEUED, "passes_computed": 0, "passes": None}
+        return {"state": RUNNING, "passes_computed": progress[0], "passes": progress[1]}
+
+    def result(self, a_key: str, a_timeout: float = None):
+        """
+        Wait for a job and return its waveform, spectrum and the first stage
+        that had to run (see run_cached), None when the result was already
+        read or cached. Raises the error of a failed job
+        """
+        with self.m_lock:
+            future = self.m_jobs.get(a_key)
+            if future is None:
+                cached = self.m_cache.get(a_key)
+                if cached is None:
+                    raise KeyError(f"Unknown job {a_key}")
+                return cached[0], cached[1], self.m_stages.pop(a_key, None)
+        return self.read(a_key, future.result(a_timeout))
+
+    def read(self, a_key: str, a_result: tuple) -> tuple:
+        # The result of a run is read, its stage is not kept any longer. The
+        #  callers of a job shared while in flight all get its stage
+        with self.m_lock:
+            self.m_stages.pop(a_key, None)
+        return a_result
+
+    async def wait(self, a_key: str):
+        """Awaitable version of result for callers running their own loop"""
+        with self.m_lock:
+            future = self.m_jobs.get(a_key)
+        if future is None:
+            return self.result(a_key)
+        return self.read(a_key, await asyncio.wrap_future(future))
+
+    def shutdown(self):
+        self.m_executor.shutdown(cancel_futures=True)
+        self.m_loop.call_soon_threadsafe(self.m_loop.stop)
+        self.m_thread.join()
+        self.m_loop.close()
+        self.m_manager.shutdown()
@@ -0,0 +1,170 @@
+import os
+import glob
+import hashlib
+import tempfile
+import numpy as np
+
+from Bearing_defect_simulation.Bearing.Bearing import Bearing
+from Bearing_defect_simulation.DES.Acquisition import Acquisition, get_frequency_axis
+from Bearing_defect_simulation.DES.Cache import DEFAULT_PATH
+from Bearing_defect_simulation.DES.Simulation import Simulation
+
+# The NASA IMS bearing files hold 20480 points sampled at 20 kHz
+NASA_FREQUENCY = 20000.0
+# Binary copies of the text files, see load_signal
+DEFAULT_CACHE = os.path.join(DEFAULT_PATH, "nasa")
+
+
+def is_numeric(a_line: str) -> bool:
+    try:
+        [float(x) for x in a_line.replace(",", " ").split()]
+    except ValueError:
+        return False
+    return True
+
+
+def read_signal(a_file_name: str) -> np.ndarray:
+    """
+    Parse a NASA text file: one column (the .csv of the test folder, with a
+    header line) or the tab separated channels of the IMS archive. Returns
+    an (n,) array for one column, (n, channels) otherwise
+    """
+    with open(a_file_name, encoding="utf-8-sig") as f:
+        first = f.readline()
+        second = f.readline()
+    header = not is_numeric(first)
+    delimiter = "," if "," in (second if header else first) else None
+    signal = np.loadtxt(a_file_name, delimiter=delimiter, skiprows=int(header),
+                        encoding="utf-8-sig", ndmin=2)
+    return signal[:, 0] if signal.shape[1] == 1 else signal
+
+
+def get_cache_name(a_file_name: str, a_cache: str) -> str:
+    path = os.path.abspath(a_file_name)
+    digest = hashlib.sha1(path.encode()).hexdigest()[:12]
+    return os.path.join(a_cache, f"{os.path.basename(path)}-{digest}.npy")
+
+
+def load_signal(a_file_name: str, a_cache: str = DEFAULT_CACHE) -> np.ndarray:
+    """
+    Signal of a NASA text file, parsed once then loaded from its .npy copy
+    in a_cache (None disables the cache) as long as the text file is older
+    """
+    if a_cache is None:
+        return read_signal(a_file_name)
+    cache_name = get_cache_name(a_file_name, a_cache)
+    try:
+        if os.path.getmtime(cache_name) >= os.path.getmtime(a_file_name):
+            return np.load(cache_name)
+    except (OSError, ValueError):
+        pass
+    signal = read_signal(a_file_name)
+    os.makedirs(a_cache, exist_ok=True)
+    # Written under a temporary name so readers never see half a file,
+    #  unique as several processes can load the same file
+    handle, temp_name = tempfile.mkstemp(
+        suffix=".tmp.npy", prefix=os.path.basename(cache_name)[:-len(".npy")],
+        dir=a_cache)
+    try:
+        with os.fdopen(handle, "wb") as f:
+            np.save(f, signal)
+        os.replace(temp_name, cache_name)
+    except BaseException:
+        os.remove(temp_name)
+        raise
+    return signal
+
+
+def load_directory(a_path: str, a_pattern: str = "*",
+                   a_cache: str = DEFAULT_CACHE):
+    """
+    Signals of all the files of a directory matching a_pattern, in the order
+    of their names (the time of the recording in the IMS archive). Returns
+    the names and an (n_files, n[, channels]) array
+    """
+    names = sorted(name for name in glob.glob(os.path.join(a_path, a_pattern))
+                   if os.path.isfile(name))
+    if not names:
+        raise ValueError(f"No file matching '{a_pattern}' in {a_path}")
+    signals = [load_signal(name, a_cache) for name in names]
+    if len({signal.shape for signal in signals}) > 1:
+        raise ValueError(f"The files of {a_path} have different lengths")
+    return [os.path.basename(name) for name in names], np.stack(signals)
+
+
+def get_spectra(a_signals: np.ndarray, a_frequency: float = NASA_FREQUENCY):
+    """
+    Amplitude spectra of a stack of signals (n_files, n[, channels]) along
+    their time axis, normalized as Acquisition.get_fft. Returns the
+    frequencies of the n // 2 bins and the (n_files, n // 2[, channels])
+    spectra
+    """
+    n = a_signals.shape[1]
+    spectra = np.abs(np.fft.rfft(a_signals, axis=1)[:, :n // 2])
+    spectra /= n
+    return get_frequency_axis(n, a_frequency), spectra
+
+
+def get_targets(a_bearing: Bearing) -> dict:
+    """Defect frequencies of a bearing (Hz)"""
+    return {"BPFO": a_bearing.get_BPFO_freq(), "BPFI": a_bearing.get_BPFI_freq()}
+
+
+def score_peaks(a_frequencies: np.ndarray, a_spectra: np.ndarray, a_targets: dict,
+                a_harmonics: int = 3, a_tolerance: float = 0.02,
+                a_background: float = 10):
+    """
+    Agreement of the spectral peaks with the defect frequencies a_targets
+    ({name: frequency}) for all the spectra at once. For harmonic k of a
+    target the peak is the largest amplitude within a_tolerance (relative)
+    of k * frequency, its score is its ratio to the median amplitude of a
+    band a_background times wider: ~1 for no peak. Returns {name: (score,
+    peak frequency)}, both (n_files, a_harmonics[, channels]) arrays
+    """
+    resolution = a_frequencies[1] - a_frequencies[0]
+    scores = {}
+    for name, frequency in a_targets.items():
+        score = []
+        peak = []
+        for k in range(1, a_harmonics + 1):
+            center = k * frequency
+            # At least one bin on each side of the target
+            width = max(a_tolerance * center, resolution)
+            low, high = np.searchsorted(a_frequencies,
+                                        [center - width, center + width])
+            background_low, background_high = np.searchsorted(a_frequencies,
+                    [center - a_background * width, center + a_background * width])
+            if high <= low:  # Above the Nyquist frequency
+                score.append(np.full(a_spectra[:, 0].shape, np.nan))
+                peak.append(np.full(a_spectra[:, 0].shape, np.nan))
+                continue
+            band = a_spectra[:, low:high]
+            score.append(band.max(axis=1) / np.median(
+                a_spectra[:, background_low:background_high], axis=1))
+            peak.append(a_frequencies[low + band.argmax(axis=1)])
+        scores[name] = (np.stack(score, axis=1), np.stack(peak, axis=1))
+    return scores
+
+
+def compare_directory(a_path: str, a_bearing: Bearing, a_pattern: str = "*",
+                      a_frequency: float = NASA_FREQUENCY, a_noise: float = 0.2,
+                      a_seed: int = 0, a_cache: str = DEFAULT_CACHE, **a_score_kwargs):
+    """
+    Score the spectral peaks of every file of a directory and of a
+    simulation of a_bearing with the same length and sampling frequency,
+    against the defect frequencies of the bearing. Returns the file names
+    and the scores of the real and of the simulated spectra (see score_peaks)
+    """
+    names, signals = load_directory(a_path, a_pattern, a_cache)
+    frequencies, spectra = get_spectra(signals, a_frequency)
+    n = signals.shape[1]
+    my_acquisition = Acquisition(a_duration=n / a_frequency,
+                                 a_frequency=a_frequency, a_noise=a_noise)
+    Simulation(a_bearing, my_acquisition, a_engine='vectorized',
+               a_verbose=False, a_seed=a_seed).start()
+    simulated = get_spectra(my_acquisition.m_waveform[None], a_frequency)[1]
+    targets = get_targets(a_bearing)
+    return {"names": names,
+            "real": score_peaks(frequencies, spectra, targets, **a_score_kwargs),
+            "simulated": score_peaks(frequencies, simulated, targets,
+                                     **a_score_kwargs)}
@@ -0,0 +1,186 @@
+# Matplotlib plotting adapter. Only imported by the methods drawing figures,
+# so the simulation core does not pay the matplotlib import.
+import math
+import numpy as np
+import matplotlib.pyplot as plt
+
+# Points drawn per line, about two per pixel of a figure of the app
+PLOT_POINTS = 2000
+# Buckets of a level of a Pyramid merged into one bucket of the next level
+PYRAMID_FACTOR = 4
+
+
+def get_extrema(a_y: np.ndarray, a_points: int) -> np.ndarray:
+    """
+    Indices of the minimum and the maximum of at most a_points / 2 buckets
+    of equal length of a_y, in increasing order
+    """
+    bucket_len = math.ceil(len(a_y) / (a_points // 2))
+    full = len(a_y) // bucket_len * bucket_len
+    buckets = a_y[:full].reshape(-1, bucket_len)
+    first = np.arange(0, full, bucket_len)
+    extrema = [first + buckets.argmin(axis=1), first + buckets.argmax(axis=1)]
+    if full < len(a_y):  # Shorter last bucket
+        extrema = [np.append(extrema[0], full + a_y[full:].argmin()),
+                   np.append(extrema[1], full + a_y[full:].argmax())]
+    # Sorted, a bucket whose minimum is its maximum gives a single point
+    return np.unique(np.column_stack(extrema))
+
+
+def minmax(a_x: np.ndarray, a_y: np.ndarray, a_points: int = PLOT_POINTS):
+    """
+    Reduce a series to the minimum and the maximum of a_points / 2 buckets,
+    in their order, so the peaks and the envelope drawn at the width of a
+    figure are the ones of the full series. Series of at most a_points
+    points (or a_points None) are returned as is
+    """
+    if a_points is None or len(a_y) <= a_points:
+        return a_x, a_y
+    index = get_extrema(a_y, a_points)
+    return a_x[index], a_y[index]
+
+
+def lttb(a_x: np.ndarray, a_y: np.ndarray, a_points: int = PLOT_POINTS):
+    """
+    Reduce a series to a_points points with the Largest Triangle Three
+    Buckets algorithm: the first and last points, then in every bucket the
+    point making the largest triangle with the point kept in the previous
+    bucket and the mean of the next bucket. Closer to the shape of the line
+    than minmax, but a peak can be lost
+    """
+    if a_points is None or len(a_y) <= a_points:
+        return a_x, a_y
+    if a_points < 3:
+        raise ValueError("LTTB needs at least 3 points")
+    x = np.asarray(a_x, dtype=float)
+    y = np.asarray(a_y, dtype=float)
+    # Buckets of the points between the first and the last
+    edges = 1 + (np.arange(a_points - 1) * (len(y) - 2)) // (a_points - 2)
+    index = np.empty(a_points, dtype=np.int64)
+    index[0] = 0
+    index[-1] = len(y) - 1
+    for k in range(a_points - 2):
+        first, last = edges[k], edges[k + 1]
+        if k + 2 < len(edges):
+            next_x = x[last:edges[k + 2]].mean()
+            next_y = y[last:edges[k + 2]].mean()
+        else:
+            next_x, next_y = x[-1], y[-1]
+        previous = index[k]
+        area = np.abs((x[previous] - next_x) * (y[first:last] - y[previous])
+                      - (x[previous] - x[first:last]) * (next_y - y[previous]))
+        index[k + 1] = first + area.argmax()
+    return a_x[index], a_y[index]
+
+
+# Reductions of a series to the points drawn
+METHODS = {"minmax": minmax, "lttb": lttb}
+
+
+class Pyramid(object):
+    """
+    Min/max envelopes of a uniformly sampled series (x = a_x0 + i * a_dx) at
+    resolutions divided by PYRAMID_FACTOR level after level, built once in
+    O(n). Any window of the series is then drawn from about a_points points
+    read in the coarsest level fine enough for it, e.g. to zoom in a long
+    waveform or a spectrum without going through all its samples. The
+    levels keep the indices of the extrema, so a window has the minimum,
+    the maximum and the time order of its samples
+    """
+    def __init__(self, a_y: np.ndarray, a_x0: float = 0.0, a_dx: float = 1.0):
+        self.m_y = a_y
+        self.m_x0 = a_x0
+        self.m_dx = a_dx
+        # Indices of the minimum and maximum of every bucket of each level,
+        # level k has buckets of PYRAMID_FACTOR ** (k + 1) samples
+        self.m_levels = []
+        index_min = index_max = None
+        n = len(a_y)
+        while n > PYRAMID_FACTOR:
+            index_min, index_max = self.reduce(index_min, index_max)
+            self.m_levels.append((index_min, index_max))
+            n = len(index_min)
+
+    def reduce(self, a_min: np.ndarray, a_max: np.ndarray):
+        """Extrema of the next level from the ones of a level (None: samples)"""
+        factor = PYRAMID_FACTOR
+        levels = []
+        for index, pick in ((a_min, np.argmin), (a_max, np.argmax)):
+            n = len(self.m_y) if index is None else len(index)
+            full = n // factor * factor
+            values = self.m_y[:full] if index is None else self.m_y[index[:full]]
+            picked = pick(values.reshape(-1, factor), axis=1) \
+                + np.arange(0, full, factor)
+            if index is not None:
+                picked = index[picked]
+            if full < n:  # Shorter last bucket
+                tail = np.arange(full, n) if index is None else index[full:]
+                picked = np.append(picked, tail[pick(self.m_y[tail])])
+            levels.append(picked)
+        return levels
+
+    def get_window(self, a_begin: float = None, a_end: float = None,
+                   a_points: int = PLOT_POINTS):
+        """
+        x and y of at most a_points points drawing the window a_begin to
+        a_end (x units, the whole series by default)
+        """
+        n = len(self.m_y)
+        first = 0 if a_begin is None else \
+            min(max(math.ceil((a_begin - self.m_x0) / self.m_dx), 0), n)
+        last = n if a_end is None else \
+            min(max(math.floor((a_end - self.m_x0) / self.m_dx) + 1, first), n)
+        if last - first <= a_points:
+            index = np.arange(first, last)
+        else:
+            # Coarsest level with at least a_points / 2 buckets in the window
+            level = -1
+            while level + 1 < len(self.m_levels) and (last - first) \
+                    // PYRAMID_FACTOR ** (level + 2) >= a_points // 2:
+                level += 1
+            if level < 0:
+                index = np.arange(first, last)
+            else:
+                bucket_len = PYRAMID_FACTOR ** (level + 1)
+                # Whole buckets of the level, the samples at the edges of the
+                # window are taken one by one
+                bucket_first = -(-first // bucket_len)
+                bucket_last = last // bucket_len
+                index_min, index_max = self.m_levels[level]
+                inside = np.sort(np.column_stack(
+                    (index_min[bucket_first:bucket_last],
+                     index_max[bucket_first:bucket_last])), axis=1).reshape(-1)
+                index = np.concatenate((
+                    np.arange(first, min(bucket_first * bucket_len, last)),
+                    inside, np.arange(max(bucket_last * bucket_len, first), last)))
+            if len(index) > a_points:
+                index = index[get_extrema(self.m_y[index], a_points)]
+        return self.m_x0 + index * self.m_dx, self.m_y[index]
+
+
+def waveform_figure(a_time: np.ndarray, a_waveform: np.ndarray,
+                    a_title: str = "Time Domain Waveform",
+                    a_points: int = PLOT_POINTS, a_method: str = "minmax"):
+    """
+    Figure of a time-domain waveform, reduced to a_points points (None draws
+    every sample) with a_method of METHODS
+    """
+    fig, ax = plt.subplots()
+    ax.plot(*METHODS[a_method](a_time, a_waveform, a_points))
+    ax.set_title(a_title)
+    ax.set_xlabel("Time (s)")
+    ax.set_ylabel("Amplitude")
+    return fig
+
+
+def spectrum_figure(a_frequencies: np.ndarray, a_amplitude: np.ndarray,
+                    a_title: str = "Frequency Domain Spectrum",
+                    a_color: str = None, a_points: int = PLOT_POINTS,
+                    a_method: str = "minmax"):
+    """Figure of a frequency-domain spectrum, reduced as waveform_figure"""
+    fig, ax = plt.subplots()
+    ax.plot(*METHODS[a_method](a_frequencies, a_amplitude, a_points), color=a_color)
+    ax.set_title(a_title)
+    ax.set_xlabel("Freq (Hz)")
+    ax.set_ylabel("Amplitude")
+    return fig
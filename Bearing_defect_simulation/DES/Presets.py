@@ -0,0 +1,69 @@
+import numpy as np
+
+# Parameters of the bearings of the public datasets, the lambda and delta
+# profiles are kept as space separated strings as they are edited as text in
+# the streamlit app
+PRESETS = {
+    "CWRU": {
+        "a_n": 9, "a_dP": 47, "a_race": "outer", "a_rpm": 1772,
+        "a_dB": 6.75, "a_theta": 15.0, "a_L": 0.4, "a_N": 3,
+        "a_lambda": "0.18 0.18 0.18", "a_delta": "0.28 0 0.28",
+        "a_duration": 1.03, "a_frequency": 12000.0, "a_noise": 0.1
+    },
+    "NASA": {
+        "a_n": 8, "a_dP": 50.0, "a_race": "inner", "a_rpm": 2000,
+        "a_dB": 7.0, "a_theta": 15.0, "a_L": 3.0, "a_N": 4,
+        "a_lambda": "0.6 0.7 0.6 0.7", "a_delta": "0 0.4 0 0.5",
+        "a_duration": 1.0, "a_frequency": 20000.0, "a_noise": 0.1
+    },
+    "Paderborn": {
+        "a_n": 16, "a_dP": 100.0, "a_race": "outer", "a_rpm": 1500,
+        "a_dB": 10.0, "a_theta": 20.0, "a_L": 4.0, "a_N": 5,
+        "a_lambda": "0.8 0.8 0.8 0.8 0.8", "a_delta": "0.3 0 0 0.6 0.7",
+        "a_duration": 1.0, "a_frequency": 64000.0, "a_noise": 0.1
+    }
+}
+
+# Default values of the app, same bearing as the default Bearing object
+DEFAULT_PRESET = {
+    "a_n": 16, "a_dP": 71.501, "a_race": "outer", "a_rpm": 2000,
+    "a_dB": 8.4074, "a_theta": 15.17, "a_L": 3.8, "a_N": 5,
+    "a_lambda": "0.7 0.7 0.8 0.8 0.8", "a_delta": "0.5 0 0.5 0 0.7",
+    "a_duration": 1.0, "a_frequency": 48000.0, "a_noise": 0.1
+}
+
+BEARING_KEYS = ("a_n", "a_dP", "a_race", "a_rpm", "a_dB", "a_theta",
+                "a_L", "a_N", "a_lambda", "a_delta")
+ACQUISITION_KEYS = ("a_duration", "a_frequency", "a_noise", "a_dtype")
+
+
+def parse_profile(a_profile) -> np.ndarray:
+    """
+    Convert a space separated profile string (as used in the presets) to an
+    array, arrays and lists are returned as arrays
+    """
+    if isinstance(a_profile, str):
+        return np.array([float(x) for x in a_profile.strip().split()])
+    return np.asarray(a_profile, dtype=float)
+
+
+def get_preset(a_name: str) -> dict:
+    """
+    Return a copy of a preset with parsed lambda and delta profiles, 'Custom'
+    (or any unknown name) returns the default preset
+    """
+    preset = dict(PRESETS.get(a_name, DEFAULT_PRESET))
+    preset["a_lambda"] = parse_profile(preset["a_lambda"])
+    preset["a_delta"] = parse_profile(preset["a_delta"])
+    return preset
+
+
+def split_preset(a_preset: dict):
+    """
+    Split a parameter dict into the Bearing and the Acquisition keyword
+    arguments
+    """
+    bearing_kwargs = {k: a_preset[k] for k in BEARING_KEYS if k in a_preset}
+    acquisition_kwargs = {k: a_preset[k] for k in ACQUISITION_KEYS
+                          if k in a_preset}
+    return bearing_kwargs, acquisition_kwargs
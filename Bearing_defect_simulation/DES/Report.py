@@ -0,0 +1,48 @@
+# Streamlit reporting adapter. The simulation core only imports this module
+# when it has something to report, so headless runs never import streamlit.
+# When streamlit is not installed the messages are printed instead.
+try:
+    import streamlit as st
+except ImportError:
+    st = None
+
+
+def write(a_text: str):
+    if st is None:
+        print(a_text)
+    else:
+        st.write(a_text)
+
+
+def markdown(a_text: str):
+    if st is None:
+        print(a_text)
+    else:
+        st.markdown(a_text)
+
+
+def subheader(a_text: str):
+    if st is None:
+        print(a_text)
+    else:
+        st.subheader(a_text)
+
+
+def success(a_text: str):
+    if st is None:
+        print(a_text)
+    else:
+        st.success(a_text)
+
+
+def error(a_text: str):
+    if st is None:
+        print(a_text)
+    else:
+        st.error(a_text)
+
+
+def show_figure(a_figure):
+    """Display a matplotlib figure in the app (saved nowhere without it)"""
+    if st is not None:
+        st.pyplot(a_figure)
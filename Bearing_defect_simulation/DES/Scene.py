@@ -0,0 +1,105 @@
+import copy
+import numpy as np
+
+from Bearing_defect_simulation.Bearing.Bearing import Bearing
+from Bearing_defect_simulation.Bearing.Defect import Defect
+from Bearing_defect_simulation.DES.Acquisition import Acquisition, add_noise
+from Bearing_defect_simulation.DES.Instrumentation import Instrumentation, NO_STAGE
+from Bearing_defect_simulation.DES.Simulation import Simulation
+
+
+def with_defect(a_bearing: Bearing, a_defect: Defect, a_race: str = None) -> Bearing:
+    """
+    Copy of a bearing with another defect, on a_race ('inner' or 'outer',
+    the race of a_bearing by default). A bearing with defects on both races
+    is a scene with one copy per defect
+    """
+    if a_race is None:
+        a_race = 'outer' if a_bearing.m_outerRace else 'inner'
+    if a_race not in ('inner', 'outer'):
+        raise ValueError("Race should be either 'inner' or 'outer'")
+    bearing = copy.copy(a_bearing)
+    bearing.m_outerRace = a_race == 'outer'
+    bearing.m_innerRace = a_race == 'inner'
+    bearing.m_defect = a_defect
+    # The time spent in the defect is proportional to its length
+    bearing.m_duration = a_bearing.m_duration * a_defect.m_L / a_bearing.m_defect.m_L
+    bearing.m_balls = None
+    return bearing
+
+
+class Scene(object):
+    """
+    Several bearings measured by the same sensor, e.g. the four bearings of
+    the NASA rig or the defects of both races of one bearing. Every source
+    is a Simulation on the acquisition of the scene, its pulses are scaled
+    by the gain of its path to the sensor and added to the waveform of the
+    acquisition: pulses of different sources on the same sample sum up
+    instead of overwriting each other. The noise is added once to the sum,
+    scaled by its maximum as in Simulation, so a scene of one source gives
+    the waveform of its Simulation with the same seed
+    """
+    def __init__(self, a_acquisition: Acquisition, a_engine: str = 'vectorized',
+                 a_seed: int = None, a_instrumentation: Instrumentation = None):
+        if a_engine == 'thread':
+            raise ValueError("A scene needs the 'vectorized' or 'template' engine")
+        self.m_acquisition = a_acquisition
+        self.m_engine = a_engine
+        # Seed of the noise as in Simulation, drawn when not given
+        if a_seed is None:
+            a_seed = np.random.SeedSequence().entropy
+        self.m_seed = a_seed
+        self.m_instrumentation = a_instrumentation
+        self.m_sources = []  # (Simulation, gain) of every source
+
+    def add(self, a_bearing: Bearing, a_gain: float = 1.0, a_rpm_profile=None):
+        """
+        Add a bearing to the scene, a_gain scales its pulses (attenuation of
+        the path to the sensor). A speed profile needs the 'template' engine
+        """
+        simulation = Simulation(a_bearing, self.m_acquisition, a_engine=self.m_engine,
+                                a_verbose=False, a_seed=self.m_seed,
+                                a_rpm_profile=a_rpm_profile,
+                                a_instrumentation=self.m_instrumentation)
+        self.m_sources.append((simulation, a_gain))
+        return simulation
+
+    def stage(self, a_name: str):
+        if self.m_instrumentation is None:
+            return NO_STAGE
+        return self.m_instrumentation.stage(a_name)
+
+    def count(self, a_name: str, a_value: int = 1):
+        if self.m_instrumentation is not None:
+            self.m_instrumentation.count(a_name, a_value)
+
+    def write_source(self, a_simulation: Simulation, a_gain: float):
+        """
+        Add the pulses of one source to the waveform, computed by chunks of
+        passes with the engine of the source
+        """
+        waveform = self.m_acquisition.m_waveform
+        for position, value in a_simulation.iter_pulses(a_simulation.get_pulses_engine()):
+            keep = position < waveform.size
+            self.count('intervals_hit', position.size)
+            value = value[keep]
+            if a_gain != 1.0:
+                value = value * a_gain
+            np.add.at(waveform, position[keep], value)
+            self.count('samples_written', value.size)
+
+    def start(self):
+        """
+        Simulate all the sources in the waveform of the acquisition, returns
+        the instrumentation (None when not instrumented)
+        """
+        waveform = self.m_acquisition.m_waveform
+        waveform[:] = 0.0
+        with self.stage('pulses'):
+            for simulation, gain in self.m_sources:
+                self.write_source(simulation, gain)
+        with self.stage('noise'):
+            add_noise(waveform, np.random.default_rng(self.m_seed),
+                      self.m_acquisition.m_noise * waveform.max(initial=0.0))
+        self.count('samples', waveform.size)
+        return self.m_instrumentation
@@ -1,7 +1,54 @@
+import functools
 import numpy as np
-from scipy import fft, ifft
-import streamlit as st
-import matplotlib.pyplot as plt
+
+WINDOWS = ('hann', 'hamming', 'boxcar')
+
+
+@functools.lru_cache(maxsize=32)
+def get_segment_plan(a_segment_len: int, a_window: str = 'hann'):
+    """
+    Everything reused by the Welch transforms of segments of a given length:
+    the periodic window, its power (sum of squares) and the rfft bin indices.
+    numpy's FFT has no plan object, so this is what is cached per segment
+    length. Only the short Welch segments are cached, an entry of the length
+    of a whole waveform would keep its arrays alive
+    """
+    if a_window not in WINDOWS:
+        raise ValueError(f"Unknown window '{a_window}', expected one of {WINDOWS}")
+    k = np.arange(a_segment_len)
+    if a_window == 'hann':
+        window = 0.5 - 0.5 * np.cos(2 * np.pi * k / a_segment_len)
+    elif a_window == 'hamming':
+        window = 0.54 - 0.46 * np.cos(2 * np.pi * k / a_segment_len)
+    else:
+        window = np.ones(a_segment_len)
+    bins = np.arange(a_segment_len // 2 + 1)
+    for array in (window, bins):
+        array.flags.writeable = False
+    return window, float(np.sum(window ** 2)), bins
+
+
+def get_hilbert(a_len: int) -> np.ndarray:
+    """
+    Analytic signal multiplier of the Hilbert transform of a_len samples:
+    keep DC (and Nyquist), double the positive frequencies
+    """
+    hilbert = np.zeros(a_len)
+    hilbert[0] = 1
+    hilbert[1:(a_len + 1) // 2] = 2
+    if a_len % 2 == 0:
+        hilbert[a_len // 2] = 1
+    return hilbert
+
+
+def get_segments(a_waveform: np.ndarray, a_segment_len: int, a_overlap: float):
+    """
+    (n_segments, a_segment_len) view of the waveform, the segments start every
+    a_segment_len * (1 - a_overlap) samples. No copy is made
+    """
+    step = max(1, int(round(a_segment_len * (1 - a_overlap))))
+    segments = np.lib.stride_tricks.sliding_window_view(a_waveform, a_segment_len)
+    return segments[::step]
 
 class Signal(object):
     """
@@ -18,7 +65,7 @@ class Signal(object):
         """
         Compute the Fast Fourier Transform (FFT) of the waveform.
         """
-        self.m_spectrum = fft.fft(self.m_waveform)  # Corrected FFT computation
+        self.m_spectrum = np.fft.fft(self.m_waveform)
         return self.m_spectrum
 
     def get_ifft(self):
@@ -26,34 +73,87 @@ class Signal(object):
         Compute the Inverse Fast Fourier Transform (IFFT) of the spectrum.
         """
         if self.m_spectrum.size == 0:
-            st.write("Error: Spectrum is empty. Please compute FFT first.")
+            from Bearing_defect_simulation.DES import Report
+            Report.write("Error: Spectrum is empty. Please compute FFT first.")
         else:
-            inverse_spectrum = ifft.ifft(self.m_spectrum)
-            st.write("Inverse FFT calculated.")
-            return inverse_spectrum
+            return np.fft.ifft(self.m_spectrum)
 
     def plot_waveform(self):
         """
         Plot the time-domain waveform using Streamlit.
         """
-        fig, ax = plt.subplots()
-        ax.plot(np.arange(self.m_waveform_len) * self.m_time_resolution, self.m_waveform)
-        ax.set_title("Time Domain Waveform")
-        ax.set_xlabel("Time (s)")
-        ax.set_ylabel("Amplitude")
-        st.pyplot(fig)
+        from Bearing_defect_simulation.DES import Plot, Report
+        Report.show_figure(Plot.waveform_figure(
+            np.arange(self.m_waveform_len) * self.m_time_resolution, self.m_waveform))
 
     def plot_spectrum(self):
         """
         Plot the frequency-domain spectrum using Streamlit.
         """
+        from Bearing_defect_simulation.DES import Plot, Report
         if self.m_spectrum.size == 0:
-            st.write("Error: Spectrum is empty. Please compute FFT first.")
+            Report.write("Error: Spectrum is empty. Please compute FFT first.")
         else:
             freq = np.fft.fftfreq(self.m_waveform_len, d=self.m_time_resolution)
-            fig, ax = plt.subplots()
-            ax.plot(freq[:self.m_waveform_len // 2], np.abs(self.m_spectrum)[:self.m_waveform_len // 2])
-            ax.set_title("Frequency Domain Spectrum")
-            ax.set_xlabel("Frequency (Hz)")
-            ax.set_ylabel("Amplitude")
-            st.pyplot(fig)
+            Report.show_figure(Plot.spectrum_figure(
+                freq[:self.m_waveform_len // 2],
+                np.abs(self.m_spectrum)[:self.m_waveform_len // 2]))
+
+    def get_welch(self, a_segment_len: int = 1024, a_overlap: float = 0.5,
+                  a_window: str = 'hann'):
+        """
+        Welch power spectral density (unit**2/Hz, one-sided): the periodograms
+        of the overlapping windowed segments, with their mean removed, are
+        computed in a single rfft over all the segments and averaged.
+        Returns the frequencies and the PSD
+        """
+        segment_len = min(a_segment_len, len(self.m_waveform))
+        window, power, bins = get_segment_plan(segment_len, a_window)
+        segments = get_segments(np.asarray(self.m_waveform, dtype=float),
+                                segment_len, a_overlap)
+        segments = segments - segments.mean(axis=1, keepdims=True)
+        segments *= window
+        psd = np.abs(np.fft.rfft(segments, axis=1)) ** 2
+        psd = psd.mean(axis=0)
+        psd *= 2 * self.m_time_resolution / power
+        # DC and Nyquist have no negative frequency counterpart
+        psd[0] /= 2
+        if segment_len % 2 == 0:
+            psd[-1] /= 2
+        return bins / (segment_len * self.m_time_resolution), psd
+
+    def get_envelope(self, a_band: tuple = None, a_segments: np.ndarray = None):
+        """
+        Hilbert envelope of the waveform (or of each row of a_segments). a_band
+        (fmin, fmax) in Hz band-passes the signal first, as done to isolate
+        the resonance excited by the defect impacts
+        """
+        waveform = self.m_waveform if a_segments is None else a_segments
+        n = np.shape(waveform)[-1]
+        hilbert = get_hilbert(n)
+        spectrum = np.fft.fft(waveform, axis=-1)
+        if a_band is None:
+            spectrum *= hilbert
+        else:
+            frequencies = np.abs(np.fft.fftfreq(n, self.m_time_resolution))
+            spectrum *= hilbert * ((frequencies >= a_band[0])
+                                   & (frequencies <= a_band[1]))
+        return np.abs(np.fft.ifft(spectrum, axis=-1))
+
+    def get_envelope_spectrum(self, a_band: tuple = None,
+                              a_segment_len: int = None, a_overlap: float = 0.5):
+        """
+        Amplitude spectrum of the Hilbert envelope, where the BPFO/BPFI peaks
+        and their harmonics show. With a_segment_len the spectra of the
+        overlapping segments are computed at once and averaged. Returns the
+        frequencies and the amplitude
+        """
+        waveform = np.asarray(self.m_waveform, dtype=float)
+        segment_len = len(waveform) if a_segment_len is None \
+            else min(a_segment_len, len(waveform))
+        segments = get_segments(waveform, segment_len, a_overlap)
+        envelope = self.get_envelope(a_band, segments)
+        envelope -= envelope.mean(axis=1, keepdims=True)
+        spectrum = np.abs(np.fft.rfft(envelope, axis=1)).mean(axis=0)
+        spectrum /= segment_len
+        return np.fft.rfftfreq(segment_len, self.m_time_resolution), spectrum
@@ -4,49 +4,120 @@ import numpy as np
 import time
 from threading import Thread
 
-import streamlit as st
-import matplotlib.pyplot as plt
-
 sys.path.append('../')
 from Bearing_defect_simulation.Bearing.Bearing import Bearing
 from Bearing_defect_simulation.Bearing.RollingElement import RollingElement
-from Bearing_defect_simulation.DES.Acquisition import Acquisition
+from Bearing_defect_simulation.DES.Acquisition import Acquisition, add_noise
+from Bearing_defect_simulation.DES.Instrumentation import Instrumentation, NO_STAGE
+
+# 'thread' runs one thread per ball pass, 'vectorized' computes all the passes
+# with array operations and gives the same waveform, 'template' stamps the
+# pulses of a single passage at the entry of every ball
+ENGINES = ('thread', 'vectorized', 'template')
+# Maximum number of (pass, step) cells held in memory by the vectorized engine
+VECTORIZED_CHUNK_CELLS = 2 ** 22
+# Samples of a speed profile integrated at once
+PROFILE_BLOCK_LEN = 2 ** 20
 
 
 class Simulation(object):
     """
     The main simulation engine
     """
-    def __init__(self, bearing: Bearing, acquisition: Acquisition):
+    def __init__(self, bearing: Bearing, acquisition: Acquisition,
+                 a_engine: str = 'thread', a_verbose: bool = True,
+                 a_seed: int = None, a_rpm_profile=None,
+                 a_instrumentation: Instrumentation = None):
+        if a_engine not in ENGINES:
+            raise ValueError(f"Unknown engine '{a_engine}', expected one of {ENGINES}")
+        if a_rpm_profile is not None and a_engine != 'template':
+            raise ValueError("A speed profile needs the 'template' engine")
         if bearing.m_outerRace:
             self.m_n_ball_to_pass = round(acquisition.m_duration * bearing.get_BPFO_freq())
         else:
             self.m_n_ball_to_pass = round(acquisition.m_duration * bearing.get_BPFI_freq())
 
-        self.m_ballList = [RollingElement(bearing.m_dB, bearing.m_duration)
-                           for i in range(self.m_n_ball_to_pass)]
         self.m_bearing = bearing
         self.m_acquisition = acquisition
         self.m_gamma = 10
+        self.m_engine = a_engine
+        self.m_verbose = a_verbose  # False for headless runs (no banner)
+        # Timings and counters of the stages, None when not instrumented
+        self.m_instrumentation = a_instrumentation
+        # Seed of the noise: an int, a np.random.SeedSequence or a
+        # np.random.Generator. Without seed one is drawn and kept so the run
+        # can be simulated again
+        if a_seed is None:
+            a_seed = np.random.SeedSequence().entropy
+        self.m_seed = a_seed
+        self.m_pulse_template = None  # Pulses of one passage, see get_pulse_template
+        # Speed of the bearing (rpm) over the acquisition, None for the
+        # constant speed of the bearing. Either an array or a function of
+        # the time, see get_speed_profile
+        self.m_rpm_profile = a_rpm_profile
+        self.m_time_enter = None  # Entry time of every pass at variable speed
+        self.m_duration_pass = None  # Time spent in the defect by every pass
+        if self.m_rpm_profile is not None:
+            with self.stage('profile'):
+                self.m_time_enter, self.m_duration_pass = self.get_passes_profile()
+            self.m_n_ball_to_pass = len(self.m_time_enter)
+        self.count('passes', self.m_n_ball_to_pass)
 
+        # Time spent in the defect by each rolling element of the bearing,
+        # pass i is made by the rolling element i % m_n. Only the threaded
+        # engine follows rolling elements of different sizes
+        self.m_ball_durations = bearing.get_ball_durations()
+        if self.m_engine != 'thread' and np.any(self.m_ball_durations != bearing.m_duration):
+            raise ValueError("Rolling elements of different sizes need the 'thread' engine")
+
+        # Only the threaded engine needs one thread per pass, the state of
+        # its rolling element is created when the thread runs
         self.m_threads = []
-        for i, ball in enumerate(self.m_ballList):
-            self.m_threads.append(Thread(target=self.run_ball_throught_defect, args=(i, ball)))
-        self.get_info()
+        if self.m_engine == 'thread':
+            with self.stage('threads'):
+                for i in range(self.m_n_ball_to_pass):
+                    self.m_threads.append(Thread(target=self.run_ball_throught_defect, args=(i,)))
+        if self.m_verbose:
+            with self.stage('banner'):
+                self.get_info()
+
+    def stage(self, a_name: str):
+        """Context of a stage of the run, timed when instrumented"""
+        if self.m_instrumentation is None:
+            return NO_STAGE
+        return self.m_instrumentation.stage(a_name)
 
-    def run_ball_throught_defect(self, i: int, ball: RollingElement):
+    def count(self, a_name: str, a_value: int = 1):
+        if self.m_instrumentation is not None:
+            self.m_instrumentation.count(a_name, a_value)
+
+    def run_ball_throught_defect(self, i: int, ball: RollingElement = None):
+        if ball is None:
+            duration = self.m_ball_durations[i % len(self.m_ball_durations)]
+            ball = RollingElement(self.m_bearing.m_dB, duration)
         time_enter_defect = i * self.m_bearing.m_duration_between_ball
         time_exit_defect = time_enter_defect + ball.m_duration
         dx = self.m_acquisition.m_dt / ball.m_duration * self.m_bearing.m_defect.m_L
         dt = time_enter_defect
-        while dt < time_exit_defect:
-            dt += self.m_acquisition.m_dt
-            ball.advance(dx)
-            interval_underball = self.find_interval_under_ball(ball, i)
-            if interval_underball:
-                amplitude = self.get_amplitude(ball, interval_underball)
-                position_in_array = self.get_position_pulse_in_waveform(time_enter_defect, dt)
-                self.m_acquisition.m_waveform[position_in_array] = amplitude
+        hits = 0
+        written = 0
+        try:
+            while dt < time_exit_defect:
+                dt += self.m_acquisition.m_dt
+                ball.advance(dx)
+                interval_underball = self.find_interval_under_ball(ball, i)
+                if interval_underball:
+                    hits += 1
+                    amplitude = self.get_amplitude(ball, interval_underball)
+                    position_in_array = self.get_position_pulse_in_waveform(time_enter_defect, dt)
+                    # A pass going out of the acquisition is cut, its pulses
+                    # outside are counted as in the other engines
+                    if position_in_array < self.m_acquisition.m_waveform_len:
+                        self.m_acquisition.m_waveform[position_in_array] = amplitude
+                        written += 1
+        finally:
+            self.count('intervals_hit', hits)
+            self.count('samples_written', written)
         return 0
 
     def get_position_pulse_in_waveform(self, time_enter_defect, dt):
@@ -63,67 +134,449 @@ class Simulation(object):
         return amplitude
 
     def find_interval_under_ball(self, ball: RollingElement, j):
-        for k in range(len(self.m_bearing.m_defect.m_x_pos_filtered)):
-            ball_pos = ball.m_x_pos_in_defect
-            begin = self.m_bearing.m_defect.m_x_pos_filtered[k]
-            end = begin + self.m_bearing.m_defect.m_lambda_filtered[k]
-
-            if begin < ball_pos < end:
-                if k not in ball.m_index_interval_touched:
-                    ball.m_index_interval_touched.append(k)
-                    return (k, self.m_bearing.m_defect.m_index_filtered[k])
-            if begin == self.m_bearing.m_defect.m_L and begin < ball_pos:
-                return (k, self.m_bearing.m_defect.m_index_filtered[k])
+        defect = self.m_bearing.m_defect
+        k, touched = defect.find_interval(ball.m_x_pos_in_defect, ball.m_intervals_touched)
+        if k < 0:
+            return 0
+        if touched:
+            ball.m_intervals_touched |= 1 << k
+        return (k, defect.m_index_filtered[k])
+
+    def get_amplitudes(self):
+        """
+        Amplitude of the pulse generated by each filtered interval, same
+        computation as get_amplitude for all the intervals at once
+        """
+        defect = self.m_bearing.m_defect
+        amplitudes = self.m_gamma * np.append(defect.m_x_pos_filtered[:1],
+                defect.m_x_pos_filtered[1:] - (defect.m_x_pos_filtered[:-1]
+                                               + defect.m_lambda_filtered[:-1]))
+        return amplitudes
+
+    def find_intervals_under_ball(self, a_x: np.ndarray):
+        """
+        Array version of find_interval_under_ball, a_x holds the successive
+        positions of one ball in the defect. Returns the index of the filtered
+        interval hit at each position, -1 where no interval is hit
+        """
+        defect = self.m_bearing.m_defect
+        hit = np.full(a_x.shape, -1)
+        touched = 0
+        for i, x in enumerate(a_x.tolist()):
+            k, inside = defect.find_interval(x, touched)
+            if inside:
+                touched |= 1 << k
+            hit[i] = k
+        return hit
+
+    def get_pulse_template(self):
+        """
+        Pulses generated by one ball passage. Every ball crosses the same
+        defect with the same dx, so the intervals hit at each step are the
+        same for all the passes. Returns the upper bound of the number of
+        steps in the defect, the steps producing a pulse (0 is the first step)
+        and the amplitude of these pulses. Computed once per simulation
+        """
+        if self.m_pulse_template is not None:
+            return self.m_pulse_template
+        acquisition = self.m_acquisition
+        defect = self.m_bearing.m_defect
+        duration = self.m_bearing.m_duration
+        dx = acquisition.m_dt / duration * defect.m_L
+        # Upper bound of the number of steps of a ball in the defect, the
+        # exact number depends on the rounding of the accumulated time
+        n_steps = int(math.ceil(duration / acquisition.m_dt)) + 2
+        x = np.cumsum(np.full(n_steps, dx))
+        hit = self.find_intervals_under_ball(x)
+        steps_hit = np.flatnonzero(hit >= 0)
+        self.m_pulse_template = (n_steps, steps_hit,
+                                 self.get_amplitudes()[hit[steps_hit]])
+        return self.m_pulse_template
+
+    def get_pulses_vectorized(self, a_first: int, a_last: int):
+        """
+        Sample positions and amplitudes of the pulses of the passes a_first to
+        a_last - 1, in writing order. The time and position of every ball are
+        accumulated step by step exactly as in run_ball_throught_defect, so
+        the pulses are the same as the ones of the threaded engine. Positions
+        can be past the end of the acquisition
+        """
+        acquisition = self.m_acquisition
+        n_steps, steps_hit, amplitudes = self.get_pulse_template()
+        time_enter = np.arange(a_first, a_last) \
+            * self.m_bearing.m_duration_between_ball
+        time_exit = time_enter + self.m_bearing.m_duration
+        times = np.full((time_enter.size, n_steps + 1), acquisition.m_dt)
+        times[:, 0] = time_enter
+        np.cumsum(times, axis=1, out=times)
+        if np.any(times[:, -1] < time_exit):
+            raise RuntimeError("Vectorized engine: step bound too small")
+        # A step is run while the time before it is below the exit time
+        run = times[:, steps_hit] < time_exit[:, None]
+        position = (times[:, steps_hit + 1] / acquisition.m_dt).astype(np.int64)
+        return position[run], np.broadcast_to(amplitudes, run.shape)[run]
+
+    def get_pulses_template(self, a_first: int, a_last: int):
+        """
+        Closed-form version of get_pulses_vectorized: the pulses of one
+        passage are stamped at the entry sample of every ball. The entry
+        sample is rounded once per pass instead of accumulating the time step
+        by step, so a pulse can land one sample away from the threaded engine
+        """
+        acquisition = self.m_acquisition
+        n_steps, steps_hit, amplitudes = self.get_pulse_template()
+        # A ball makes steps while its time in the defect is below duration
+        n_run = math.ceil(self.m_bearing.m_duration / acquisition.m_dt)
+        amplitudes = amplitudes[steps_hit < n_run]
+        offsets = steps_hit[steps_hit < n_run] + 1
+        time_enter = np.arange(a_first, a_last) \
+            * self.m_bearing.m_duration_between_ball
+        index_enter = np.floor(time_enter / acquisition.m_dt).astype(np.int64)
+        position = index_enter[:, None] + offsets
+        return position.reshape(-1), \
+            np.broadcast_to(amplitudes, position.shape).reshape(-1)
+
+    def get_speed_profile(self):
+        """
+        Generate the speed profile as blocks (time of the first point, time
+        between points, rpm). A function is evaluated on the acquisition time
+        grid, an array of the length of the waveform is taken on the grid, a
+        shorter array is spread evenly over the duration of the acquisition
+        """
+        acquisition = self.m_acquisition
+        profile = self.m_rpm_profile
+        if not callable(profile):
+            profile = np.asarray(profile, dtype=float)
+            if profile.size != acquisition.m_waveform_len:
+                if profile.size < 2:
+                    raise ValueError("A speed profile needs at least 2 points")
+                yield 0.0, acquisition.m_duration / (profile.size - 1), profile
+                return
+        for begin in range(0, acquisition.m_waveform_len, PROFILE_BLOCK_LEN):
+            end = min(begin + PROFILE_BLOCK_LEN, acquisition.m_waveform_len)
+            if callable(profile):
+                rpm = profile(np.arange(begin, end) * acquisition.m_dt)
+                rpm = np.broadcast_to(np.asarray(rpm, dtype=float), (end - begin,))
+            else:
+                rpm = profile[begin:end]
+            yield begin * acquisition.m_dt, acquisition.m_dt, rpm
+
+    def get_passes_profile(self):
+        """
+        Entry time and time spent in the defect of every pass for the speed
+        profile. The pass frequency scales with the speed, so the number of
+        passes is the integral of the pass frequency (the phase), integrated
+        with the trapezoidal rule block by block. Pass i enters when the
+        phase reaches i, interpolated between two points of the profile. The
+        time in the defect is the one of the bearing scaled by the speed at
+        the entry. At constant speed the passes enter every
+        m_duration_between_ball as with the other engines. A pass entering
+        at standstill (e.g. pass 0 of a run-up from 0 rpm) never runs
+        through the defect and is dropped
+        """
+        bearing = self.m_bearing
+        rpm_nominal = bearing.m_rpm * 60
+        # Passes per second and per rpm
+        rate = 1 / (bearing.m_duration_between_ball * rpm_nominal)
+        time_enter = []
+        rpm_enter = []
+        phase = 0.0
+        previous = None  # Last point of the previous block (time, rpm)
+        for time_first, step, rpm in self.get_speed_profile():
+            if np.any(rpm < 0):
+                raise ValueError("The speed profile should not be negative")
+            if previous is None:
+                previous = (time_first, rpm[0])
+            # phases[0] is the previous point and phases[j + 1] the point j of
+            # the block: the trapezoids of the block are the cumulative sum of
+            # the speed minus half the first and the current speeds
+            phases = np.empty(rpm.size + 1)
+            phases[0] = phase
+            np.cumsum(rpm, out=phases[1:])
+            phases[1:] -= rpm * 0.5
+            phases[1:] -= rpm[0] * 0.5
+            phases[1:] *= rate * step
+            phases[1:] += phase + rate * (previous[1] + rpm[0]) / 2 \
+                * (time_first - previous[0])
+            passes = np.arange(math.ceil(phases[0]), math.ceil(phases[-1]))
+            # Pass i is between the points k and k + 1 of phases
+            k = np.searchsorted(phases, passes, side='right') - 1
+            time_low = np.where(k > 0, time_first + (k - 1) * step, previous[0])
+            rpm_low = np.where(k > 0, rpm[np.maximum(k - 1, 0)], previous[1])
+            time_high = time_first + k * step
+            # The speed is linear between two points, the phase quadratic:
+            # pass i enters tau after time_low with
+            # rate * (rpm_low * tau + slope * tau^2 / 2) = i - phases[k]
+            delta = passes - phases[k]
+            slope = (rpm[k] - rpm_low) / np.where(time_high > time_low,
+                                                  time_high - time_low, 1)
+            root = rate * rpm_low + np.sqrt((rate * rpm_low) ** 2
+                                            + 2 * rate * slope * delta)
+            tau = np.divide(2 * delta, root, out=np.zeros(delta.shape),
+                            where=root > 0)
+            # At constant speed the same as the interpolation of the phase
+            fraction = delta / (phases[k + 1] - phases[k])
+            constant = rpm[k] == rpm_low
+            time_enter.append(np.where(
+                constant, time_low + fraction * (time_high - time_low),
+                time_low + tau))
+            rpm_enter.append(np.where(constant, rpm_low, rpm_low + slope * tau))
+            phase = phases[-1]
+            previous = (time_first + (rpm.size - 1) * step, rpm[-1])
+        time_enter = np.concatenate(time_enter) if time_enter else np.zeros(0)
+        rpm_enter = np.concatenate(rpm_enter) if rpm_enter else np.zeros(0)
+        # Number of passes as in the constructor, the defect frequency times
+        # the duration, the last speed being kept up to the end
+        if previous is not None:
+            phase += previous[1] * rate * (self.m_acquisition.m_duration - previous[0])
+        frequency = bearing.get_BPFO_freq() if bearing.m_outerRace \
+            else bearing.get_BPFI_freq()
+        n = round(phase * frequency * bearing.m_duration_between_ball)
+        moving = rpm_enter[:n] > 0
+        return time_enter[:n][moving], \
+            bearing.m_duration * rpm_nominal / rpm_enter[:n][moving]
+
+    def get_pulses_profile(self, a_first: int, a_last: int):
+        """
+        Closed-form pulses of the passes a_first to a_last - 1 at variable
+        speed, each pass with its own entry time and step dx in the defect.
+        Step j of a pass is at j * dx, an interval gives a pulse at its first
+        step inside and the interval beginning at m_L at every step past m_L,
+        as in find_interval_under_ball. Same pulses as the 'template' engine
+        at constant speed, up to the rounding of the entry and of the steps
+        """
+        acquisition = self.m_acquisition
+        defect = self.m_bearing.m_defect
+        duration = self.m_duration_pass[a_first:a_last, None]
+        dx = acquisition.m_dt / duration * defect.m_L
+        index_enter = np.floor(self.m_time_enter[a_first:a_last, None]
+                               / acquisition.m_dt).astype(np.int64)
+        # A slow pass is cut at the end of the acquisition, its steps after
+        # it are not written
+        n_run = np.minimum(np.ceil(duration / acquisition.m_dt),
+                           acquisition.m_waveform_len - index_enter)
+        begin = defect.m_x_pos_filtered
+        end = begin + defect.m_lambda_filtered
+        amplitudes = self.get_amplitudes()
+        step = np.floor(begin / dx).astype(np.int64) + 1
+        hit = (step * dx < end) & (step <= n_run)
+        if defect.m_index_L < len(begin):
+            # Past m_L the interval beginning at m_L is always under the ball
+            hit &= step * dx <= defect.m_L
+            first_L = np.floor(defect.m_L / dx).astype(np.int64) + 1
+            n_L = np.maximum(n_run - first_L + 1, 0).astype(np.int64)
+            extra = np.arange(n_L.max() if n_L.size else 0)
+            step = np.hstack((step, first_L + extra))
+            hit = np.hstack((hit, extra < n_L))
+            amplitudes = np.append(amplitudes, np.full(
+                extra.size, amplitudes[defect.m_index_L]))
+        position = index_enter + step
+        return position[hit], np.broadcast_to(amplitudes, hit.shape)[hit]
+
+    def get_pulses_engine(self):
+        """
+        Function giving the pulses of a range of passes with the engine of
+        the simulation, e.g. for iter_pulses
+        """
+        if self.m_engine == 'thread':
+            raise ValueError("The threaded engine has no pulse function, use "
+                             "the 'vectorized' or 'template' engine")
+        if self.m_rpm_profile is not None:
+            return self.get_pulses_profile
+        if self.m_engine == 'template':
+            return self.get_pulses_template
+        return self.get_pulses_vectorized
+
+    def iter_pulses(self, a_get_pulses):
+        """
+        Generate the pulses of all the passes, the passes are computed by
+        chunks to bound the memory. Positions can be past the acquisition
+        """
+        acquisition = self.m_acquisition
+        if self.m_rpm_profile is not None:
+            # One cell per interval and per step past m_L
+            n_cells = len(self.m_bearing.m_defect.m_x_pos_filtered) + 2
+        else:
+            n_cells = self.get_pulse_template()[0] + 1
+        chunk = max(1, VECTORIZED_CHUNK_CELLS // n_cells)
+        for first in range(0, self.m_n_ball_to_pass, chunk):
+            last = min(first + chunk, self.m_n_ball_to_pass)
+            yield a_get_pulses(first, last)
+            # Progress of the run, e.g. for the job service
+            self.count('passes_computed', last - first)
+
+    def write_pulses(self, a_get_pulses):
+        """
+        Write the pulses of all the passes into the waveform in a single
+        scatter
+        """
+        positions = []
+        values = []
+        for position, value in self.iter_pulses(a_get_pulses):
+            # Passes going out of the acquisition are cut as in the threads
+            keep = position < self.m_acquisition.m_waveform_len
+            self.count('intervals_hit', position.size)
+            positions.append(position[keep])
+            values.append(value[keep])
+        if positions:
+            positions = np.concatenate(positions)
+            self.m_acquisition.m_waveform[positions] = np.concatenate(values)
+            self.count('samples_written', positions.size)
+        return 0
+
+    def run_balls_vectorized(self):
+        """
+        Run all the balls through the defect at once, same waveform as the
+        threaded engine but all the passes are computed as arrays
+        """
+        return self.write_pulses(self.get_pulses_vectorized)
+
+    def run_balls_template(self):
+        """
+        Closed-form engine: the pulses of one passage are computed once and
+        stamped at the entry sample of every ball. The cost is proportional
+        to the number of passes plus the length of the template. With a
+        speed profile every pass has its own closed-form pulses
+        """
+        if self.m_rpm_profile is not None:
+            return self.write_pulses(self.get_pulses_profile)
+        return self.write_pulses(self.get_pulses_template)
+
+    def get_pass_range(self, a_begin: int, a_end: int):
+        """
+        First and last (excluded) passes whose pulses can land in the samples
+        a_begin to a_end - 1
+        """
+        dt = self.m_acquisition.m_dt
+        if self.m_rpm_profile is not None:
+            # The entry times are sorted, a pass spans its time in the defect
+            first = np.searchsorted(self.m_time_enter, (a_begin - 2) * dt
+                                    - self.m_duration_pass.max(initial=0)) - 1
+            last = np.searchsorted(self.m_time_enter, a_end * dt, side='right') + 1
+            first = min(max(int(first), 0), self.m_n_ball_to_pass)
+            return first, min(max(int(last), first), self.m_n_ball_to_pass)
+        between = self.m_bearing.m_duration_between_ball
+        # A pass writes from its entry sample to one sample after its exit
+        first = math.floor(((a_begin - 2) * dt - self.m_bearing.m_duration)
+                           / between) - 1
+        last = math.ceil(a_end * dt / between) + 1
+        first = min(max(first, 0), self.m_n_ball_to_pass)
+        return first, min(max(last, first), self.m_n_ball_to_pass)
+
+    def stream(self, a_block_len: int = 2 ** 16):
+        """
+        Generate the waveform, noise included, as successive blocks of
+        a_block_len samples (the last one can be shorter). Only the passes
+        overlapping the current block are computed and m_waveform is not
+        used, so the memory does not depend on the acquisition duration. The
+        blocks put end to end give the waveform of start() with the same seed
+        """
+        if self.m_engine == 'thread':
+            raise ValueError("The threaded engine cannot stream, use the "
+                             "'vectorized' or 'template' engine")
+        acquisition = self.m_acquisition
+        get_pulses = self.get_pulses_engine()
+        # The noise scales with the maximum of the noise-free waveform, which
+        # is the largest pulse of a pass, or 0 for the samples without pulse
+        if self.m_rpm_profile is not None:
+            # The pulses depend on the speed of each pass, all are looked at
+            peak = max((value[position < acquisition.m_waveform_len].max(
+                initial=0.0) for position, value in self.iter_pulses(get_pulses)),
+                       default=0.0)
+        else:
+            position, value = get_pulses(0, min(1, self.m_n_ball_to_pass))
+            value = value[position < acquisition.m_waveform_len]
+            peak = value.max() if value.size else 0.0
+        peak = max(0.0, peak)
+        generator = np.random.default_rng(self.m_seed)
+        for begin in range(0, acquisition.m_waveform_len, a_block_len):
+            end = min(begin + a_block_len, acquisition.m_waveform_len)
+            with self.stage('pulses'):
+                block = np.zeros(end - begin, dtype=acquisition.m_dtype)
+                position, value = get_pulses(*self.get_pass_range(begin, end))
+                keep = (position >= begin) & (position < end)
+                block[position[keep] - begin] = value[keep]
+            self.count('samples_written', int(np.count_nonzero(keep)))
+            self.count('samples', end - begin)
+            with self.stage('noise'):
+                add_noise(block, generator, acquisition.m_noise * peak)
+            yield block
+
+    def run_pulses(self):
+        """Write the noise-free waveform into the acquisition"""
+        with self.stage('pulses'):
+            if self.m_engine == 'vectorized':
+                self.run_balls_vectorized()
+            elif self.m_engine == 'template':
+                self.run_balls_template()
+            else:
+                for t in self.m_threads:
+                    t.start()
+                for t in self.m_threads:
+                    t.join()
+        return 0
+
+    def run_noise(self):
+        """
+        Add the noise to the noise-free waveform of the acquisition, scaled
+        by its maximum. A seed gives the same noise every run (a Generator
+        continues its stream)
+        """
+        with self.stage('noise'):
+            waveform = self.m_acquisition.m_waveform
+            add_noise(waveform, np.random.default_rng(self.m_seed),
+                      self.m_acquisition.m_noise * waveform.max())
         return 0
 
     def start(self):
+        """
+        Run the simulation, returns the instrumentation (None when not
+        instrumented) with the timings and counters of the run
+        """
         time_start = time.time()
-        for t in self.m_threads:
-            t.start()
-        for t in self.m_threads:
-            t.join()
-        noise = np.random.normal(0,
-                                 self.m_acquisition.m_noise * max(self.m_acquisition.m_waveform),
-                                 self.m_acquisition.m_waveform.shape)
-        self.m_acquisition.m_waveform += noise
-        st.success(f"Simulation completed in {time.time() - time_start:.4f}s.")
+        self.run_pulses()
+        self.run_noise()
+        self.count('samples', self.m_acquisition.m_waveform_len)
+        if self.m_verbose:
+            with self.stage('report'):
+                from Bearing_defect_simulation.DES import Report
+                Report.success(f"Simulation completed in {time.time() - time_start:.4f}s.")
+        return self.m_instrumentation
 
     def get_results(self, format: str, file_name='results.png', title="Simulated Spectrum"):
-        fft_res = self.m_acquisition.get_fft()
-        x = fft_res[0][:int(self.m_acquisition.m_frequency / 10)]
-        y = fft_res[1][:int(self.m_acquisition.m_frequency / 10)]
+        # Only the bins below a tenth of the sampling frequency are displayed
+        with self.stage('fft'):
+            x, y = self.m_acquisition.get_fft(a_fmax=self.m_acquisition.m_frequency / 10)
 
+        # Plotting and reporting adapters are only imported when used
         if format == 'as_array':
-            st.subheader("Output formatted as array")
-            return np.linspace(0, self.m_acquisition.m_duration, self.m_acquisition.m_waveform_len), \
-                   self.m_acquisition.m_waveform
+            if self.m_verbose:
+                from Bearing_defect_simulation.DES import Report
+                Report.subheader("Output formatted as array")
+            return self.m_acquisition.get_time_axis(), self.m_acquisition.m_waveform
 
         elif format == 'as_file':
-            plt.figure()
-            plt.title(title)
-            plt.xlabel("Freq (Hz)")
-            plt.ylabel("Amplitude")
-            plt.plot(x, y, color="red")
-            plt.savefig(file_name)
-            st.success(f"Saved spectrum to `{file_name}`")
+            with self.stage('plot'):
+                from Bearing_defect_simulation.DES import Plot, Report
+                fig = Plot.spectrum_figure(x, y, a_title=title, a_color="red")
+                fig.savefig(file_name)
+            if self.m_verbose:
+                Report.success(f"Saved spectrum to `{file_name}`")
 
         elif format == 'as_graph' or format == 'show':
-            fig, ax = plt.subplots()
-            ax.plot(x, y, color="red")
-            ax.set_title(title)
-            ax.set_xlabel("Freq (Hz)")
-            ax.set_ylabel("Amplitude")
-            st.pyplot(fig)
-
-            time_axis = np.linspace(0, self.m_acquisition.m_duration, self.m_acquisition.m_waveform_len)
-            amplitude = self.m_acquisition.m_waveform
-            return time_axis, amplitude 
+            with self.stage('plot'):
+                from Bearing_defect_simulation.DES import Plot, Report
+                fig = Plot.spectrum_figure(x, y, a_title=title, a_color="red")
+                Report.show_figure(fig)
+            return self.m_acquisition.get_time_axis(), self.m_acquisition.m_waveform
 
         else:
-            st.error("Err: Unknown format in get_results()")
+            from Bearing_defect_simulation.DES import Report
+            Report.error("Err: Unknown format in get_results()")
 
     def get_info(self):
+        from Bearing_defect_simulation.DES import Report
         self.m_bearing.get_info()
         self.m_acquisition.get_info()
-        st.markdown("### 🛠️ Simulation Parameters")
-        st.write(f"**Number of balls to pass on the defect**: {self.m_n_ball_to_pass}")
+        Report.markdown("### 🛠️ Simulation Parameters")
+        Report.write(f"**Number of balls to pass on the defect**: {self.m_n_ball_to_pass}")
@@ -0,0 +1,118 @@
+import numpy as np
+
+from Bearing_defect_simulation.DES.Fleet import Fleet
+
+# Configurations of a fleet whose comb is computed at once
+SURROGATE_CHUNK = 2 ** 16
+
+
+def get_pulse_phasors(a_fleet: Fleet, a_intervals, a_rows: np.ndarray,
+                      a_theta: np.ndarray):
+    """
+    Fourier transform P of the pulses of one passage for the bearings a_rows
+    at the angular frequencies (rad per sample) a_theta, (rows, harmonics),
+    a_intervals being the Fleet.get_filtered_intervals of the fleet.
+    The pulses are the closed-form ones of Simulation.get_pulses_profile: an
+    interval gives a pulse at its first step inside, the interval beginning
+    at L one at every step past L
+    """
+    dt = a_fleet.m_acquisition.m_dt
+    duration = a_fleet.m_duration[a_rows, None]
+    L = a_fleet.m_L[a_rows, None]
+    dx = dt / duration * L
+    n_run = np.ceil(duration / dt)
+    begins, widths, amplitudes = (array[a_rows] for array in a_intervals)
+    finite = np.isfinite(begins)
+    step = np.floor(np.where(finite, begins, 0) / dx) + 1
+    at_L = finite & (begins == L)
+    has_L = at_L.any(axis=1, keepdims=True)
+    hit = finite & (step * dx < begins + widths) & (step <= n_run) \
+        & ~(has_L & (step * dx > L))
+    amplitude_L = np.where(at_L, amplitudes, 0).sum(axis=1, keepdims=True)
+    # Sum over the intervals hit of a * exp(-i theta step)
+    phasors = np.einsum('rk,rkh->rh', np.where(hit, amplitudes, 0),
+                        np.exp(-1j * step[:, :, None] * a_theta[:, None, :]))
+    # Steps first_L to n_run at the interval beginning at L, geometric sum
+    first_L = np.floor(L / dx) + 1
+    n_L = np.where(has_L, np.maximum(n_run - first_L + 1, 0), 0)
+    ratio = np.exp(-1j * a_theta)
+    flat = np.abs(1 - ratio) < 1e-12
+    series = np.where(flat, n_L,
+                      (1 - ratio ** n_L) / np.where(flat, 1, 1 - ratio))
+    return phasors + amplitude_L * ratio ** first_L * series
+
+
+def get_comb(a_fleet: Fleet, a_harmonics: int = 5):
+    """
+    Spectral surrogate of the template engine: the peaks of the spectrum of
+    every bearing of a_fleet at the harmonics of its pass frequency
+    (1 / m_duration_between_ball, the BPFO), computed in the frequency
+    domain without simulating the waveform. The M passes of a bearing are M
+    copies of the pulses of one passage, so at the FFT bin f closest to a
+    harmonic the amplitude of Acquisition.get_fft is |P(f)| times the comb
+    |sin(pi M f T) / sin(pi f T)| divided by the number of samples. The
+    engine rounds the entry of every pass to a sample, the surrogate does
+    not: its error grows with the harmonic, see get_errors. Returns the
+    frequencies of these bins and the amplitudes, both (n_bearings,
+    a_harmonics) arrays, nan above the Nyquist frequency
+    """
+    acquisition = a_fleet.m_acquisition
+    n = acquisition.m_waveform_len
+    resolution = acquisition.m_frequency / n
+    frequencies = np.full((a_fleet.m_n_bearings, a_harmonics), np.nan)
+    amplitudes = np.full((a_fleet.m_n_bearings, a_harmonics), np.nan)
+    intervals = a_fleet.get_filtered_intervals()
+    for first in range(0, a_fleet.m_n_bearings, SURROGATE_CHUNK):
+        rows = np.arange(first, min(first + SURROGATE_CHUNK,
+                                    a_fleet.m_n_bearings))
+        period = a_fleet.m_duration_between_ball[rows, None]
+        bins = np.round(np.arange(1, a_harmonics + 1) / period / resolution)
+        valid = bins < n // 2
+        bins = np.where(valid, bins, 0)
+        frequency = bins * resolution
+        # Passes entering before the end of the acquisition
+        passes = np.minimum(a_fleet.m_n_ball_to_pass[rows, None],
+                            np.ceil(n * acquisition.m_dt / period))
+        denominator = np.sin(np.pi * frequency * period)
+        comb = np.where(np.abs(denominator) < 1e-12, passes, np.abs(
+            np.sin(np.pi * passes * frequency * period)
+            / np.where(np.abs(denominator) < 1e-12, 1, denominator)))
+        pulses = get_pulse_phasors(a_fleet, intervals, rows,
+                                   2 * np.pi * frequency * acquisition.m_dt)
+        frequencies[rows] = np.where(valid, frequency, np.nan)
+        amplitudes[rows] = np.where(valid, np.abs(pulses) * comb / n, np.nan)
+    return frequencies, amplitudes
+
+
+def get_errors(a_fleet: Fleet, a_harmonics: int = 5):
+    """
+    Error of the surrogate against the full simulation of a_fleet (Fleet
+    gives the waveforms of the template engine, its noise is left out),
+    e.g. on a sample of the configurations screened with get_comb. At every
+    harmonic the simulated peak is the largest amplitude within one bin of
+    the surrogate bin. Returns the relative error of the amplitudes and the
+    distance of the simulated peak to the surrogate bin (bins), both
+    (n_bearings, a_harmonics) arrays
+    """
+    acquisition = a_fleet.m_acquisition
+    frequencies, amplitudes = get_comb(a_fleet, a_harmonics)
+    noise = acquisition.m_noise
+    acquisition.m_noise = 0.0
+    try:
+        waveforms = a_fleet.start()
+    finally:
+        acquisition.m_noise = noise
+    n = acquisition.m_waveform_len
+    spectra = np.abs(np.fft.rfft(waveforms, axis=1)[:, :n // 2]) / n
+    bins = np.round(np.nan_to_num(frequencies / (acquisition.m_frequency / n),
+                                  nan=-2)).astype(np.int64)
+    # Bins k - 1, k and k + 1 around each harmonic, clipped to the spectrum
+    around = np.clip(bins[:, :, None] + np.arange(-1, 2), 0, n // 2 - 1)
+    rows = np.arange(a_fleet.m_n_bearings)[:, None, None]
+    neighbours = spectra[rows, around]
+    simulated = neighbours.max(axis=2)
+    offset = neighbours.argmax(axis=2) - 1.0
+    valid = np.isfinite(frequencies)
+    errors = np.where(valid, np.abs(amplitudes - simulated)
+                      / np.where(simulated > 0, simulated, np.nan), np.nan)
+    return errors, np.where(valid, offset, np.nan)
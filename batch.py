@@ -0,0 +1,57 @@
+import sys
+import json
+import argparse
+import numpy as np
+
+sys.path.append('../')
+from Bearing_defect_simulation.DES.Batch import Batch
+from Bearing_defect_simulation.DES.Dataset import DatasetWriter
+from Bearing_defect_simulation.DES.Simulation import ENGINES
+from Bearing_defect_simulation.DES.Presets import PRESETS
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Run a sweep of bearing simulations over a process pool")
+    parser.add_argument("spec", help="JSON file with the sweep: a grid "
+                        "{parameter: [values]} or a list of parameter dicts")
+    parser.add_argument("--preset", default="Custom",
+                        choices=["Custom"] + list(PRESETS),
+                        help="Base parameters updated by the sweep")
+    parser.add_argument("--engine", default="vectorized", choices=ENGINES)
+    parser.add_argument("--workers", type=int, default=None,
+                        help="Number of processes (default: all the cores)")
+    parser.add_argument("--chunksize", type=int, default=1,
+                        help="Simulations sent at once to a worker")
+    parser.add_argument("--seed", type=int, default=None,
+                        help="Seed of the batch, the noise of every "
+                        "simulation is drawn from it (default: random)")
+    parser.add_argument("--output", default="batch.npz",
+                        help="Output .npz file with the waveforms and params")
+    parser.add_argument("--dataset", default=None,
+                        help="Append the runs to this dataset folder instead "
+                        "of writing a .npz file")
+    args = parser.parse_args()
+
+    with open(args.spec) as f:
+        sweep = json.load(f)
+    batch = Batch(sweep, a_base=args.preset, a_engine=args.engine,
+                  a_max_workers=args.workers, a_chunksize=args.chunksize,
+                  a_seed=args.seed)
+    if args.dataset is not None:
+        # Each waveform is written as soon as it is available
+        with DatasetWriter(args.dataset) as writer:
+            for params, waveform in zip(batch.m_params, batch.run_iter()):
+                writer.append(waveform, params, a_engine=args.engine)
+        print(f"{len(batch.m_params)} simulations appended to {args.dataset}")
+        return
+    waveforms = batch.run()
+    # The waveforms can have different lengths (duration and frequency can be
+    # swept) so they are saved one array each, in the order of the sweep
+    params = [{k: v.tolist() if isinstance(v, np.ndarray) else v
+               for k, v in p.items()} for p in batch.m_params]
+    np.savez(args.output, params=json.dumps(params),
+             **{f"waveform_{i}": w for i, w in enumerate(waveforms)})
+    print(f"{len(waveforms)} simulations saved to {args.output}")
+
+if __name__ == "__main__":
+    main()
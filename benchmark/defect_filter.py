@@ -0,0 +1,48 @@
+import sys
+import time
+import argparse
+import numpy as np
+
+# The original quadratic filtering is kept in the validation script
+sys.path.append('../')
+sys.path.append('../test')
+from Bearing_defect_simulation.Bearing.Defect import Defect
+from defect_validation import filter_interval_reference
+
+# The original filtering is only timed up to this number of intervals
+REFERENCE_MAX_N = 10 ** 4
+
+def time_call(a_function, a_repeat):
+    timings = []
+    for i in range(a_repeat):
+        time_start = time.perf_counter()
+        a_function()
+        timings.append(time.perf_counter() - time_start)
+    return min(timings)
+
+def main():
+    parser = argparse.ArgumentParser(description="Defect filtering time")
+    parser.add_argument("--sizes", type=int, nargs="+",
+                        default=[10 ** 2, 10 ** 3, 10 ** 4, 10 ** 5, 10 ** 6])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    print("################# Defect filtering benchmark  ##### ")
+    print("# Random rising depth profile of N intervals (every")
+    print("#  interval is in contact), best of")
+    print(f"#  {args.repeat} runs. The original algorithm is skipped")
+    print(f"#  above {REFERENCE_MAX_N} intervals")
+    print("################################################### ")
+    rng = np.random.default_rng(0)
+    for N in args.sizes:
+        depths = np.sort(-rng.random(N))
+        widths = np.full(N, 1e-3)
+        new = time_call(lambda: Defect.from_profile(depths, widths), args.repeat)
+        line = f"# N={N:>8d}  Defect {1000 * new:10.2f}ms"
+        if N <= REFERENCE_MAX_N:
+            old = time_call(lambda: filter_interval_reference(depths, widths),
+                            args.repeat)
+            line += f"  original {1000 * old:10.2f}ms  x{old / new:8.1f}"
+        print(line)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,146 @@
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import tempfile
+import tracemalloc
+import subprocess
+import numpy as np
+
+sys.path.append('../')
+from Bearing_defect_simulation.Bearing.Bearing import Bearing
+from Bearing_defect_simulation.DES.Simulation import Simulation, ENGINES
+from Bearing_defect_simulation.DES.Acquisition import Acquisition
+from Bearing_defect_simulation.DES.Export import Export, FORMATS
+from Bearing_defect_simulation.DES.Presets import PRESETS, get_preset, \
+        split_preset
+
+# 'Custom' is the default preset of the app, the bearing of Bearing()
+CASES = list(PRESETS) + ["Custom"]
+DURATIONS = [0.1, 1, 10, 60, 600]
+FREQUENCIES = [12000, 48000, 64000]
+# Stages timed for every case, in order
+STAGES = ("construct", "start", "fft", "export")
+
+def get_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"],
+                              check=True, capture_output=True,
+                              text=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def run_case(a_name, a_engine, a_duration, a_frequency, a_formats, a_folder):
+    """
+    Time the stages of one simulation, returns the timings (s) and the peak
+    of the memory allocated by python and numpy during the run (bytes)
+    """
+    bearing_kwargs, acquisition_kwargs = split_preset(get_preset(a_name))
+    acquisition_kwargs.update(a_duration=a_duration, a_frequency=a_frequency)
+    timings = {}
+    tracemalloc.reset_peak()
+    memory_start = tracemalloc.get_traced_memory()[0]
+
+    time_start = time.perf_counter()
+    my_acquisition = Acquisition(**acquisition_kwargs)
+    my_simulation = Simulation(Bearing(**bearing_kwargs), my_acquisition,
+                               a_engine=a_engine, a_verbose=False, a_seed=0)
+    timings["construct"] = time.perf_counter() - time_start
+
+    time_start = time.perf_counter()
+    my_simulation.start()
+    timings["start"] = time.perf_counter() - time_start
+
+    time_start = time.perf_counter()
+    my_acquisition.get_fft()
+    timings["fft"] = time.perf_counter() - time_start
+
+    time_start = time.perf_counter()
+    time_axis = np.linspace(0, a_duration, my_acquisition.m_waveform_len)
+    export = Export(time_axis, my_acquisition.m_waveform)
+    for file_format in a_formats:
+        export.save(file_format, os.path.join(a_folder, FORMATS[file_format][0]))
+    timings["export"] = time.perf_counter() - time_start
+
+    peak = tracemalloc.get_traced_memory()[1] - memory_start
+    return my_acquisition.m_waveform_len, timings, peak
+
+def compare(a_results, a_reference_file):
+    # Ratio of the total time of every case to the one of a previous run
+    with open(a_reference_file) as f:
+        reference = json.load(f)
+    key = lambda r: (r["preset"], r["engine"], r["duration"], r["frequency"])
+    previous = {key(r): r for r in reference["results"]}
+    print(f"# Compared to {reference.get('commit')} ({a_reference_file}), "
+          "ratio > 1 is slower")
+    for result in a_results:
+        if key(result) in previous:
+            ratio = result["total_s"] / previous[key(result)]["total_s"]
+            print(f"# {result['preset']:10s} {result['engine']:10s} "
+                  f"{result['duration']:6g}s {result['frequency']:6g}Hz  "
+                  f"x{ratio:6.2f}{'  SLOWER' if ratio > 1.2 else ''}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulation engine benchmark")
+    parser.add_argument("--presets", nargs="+", default=CASES, choices=CASES)
+    parser.add_argument("--engines", nargs="+", default=["vectorized"],
+                        choices=ENGINES)
+    parser.add_argument("--durations", type=float, nargs="+", default=DURATIONS)
+    parser.add_argument("--frequencies", type=float, nargs="+",
+                        default=FREQUENCIES)
+    parser.add_argument("--formats", nargs="*", default=["npy"],
+                        choices=list(FORMATS),
+                        help="Export formats timed (the text formats are slow "
+                        "for long acquisitions)")
+    parser.add_argument("--output", default="engine.json",
+                        help="JSON file of the results")
+    parser.add_argument("--compare", default=None,
+                        help="JSON file of a previous run to compare with")
+    args = parser.parse_args()
+    print("################# Engine benchmark  ############### ")
+    print("# Times the construction, start, FFT and export of")
+    print("#  a simulation for each preset, engine, duration")
+    print("#  and sampling frequency. The memory is the peak")
+    print("#  allocated by python and numpy during the run")
+    print("################################################### ")
+    tracemalloc.start()
+    results = []
+    with tempfile.TemporaryDirectory() as folder:
+        for name in args.presets:
+            for engine in args.engines:
+                for duration in args.durations:
+                    for frequency in args.frequencies:
+                        samples, timings, peak = run_case(
+                            name, engine, duration, frequency, args.formats,
+                            folder)
+                        total = sum(timings.values())
+                        result = {
+                            "preset": name, "engine": engine,
+                            "duration": duration, "frequency": frequency,
+                            "samples": samples,
+                            **{stage + "_s": timings[stage] for stage in STAGES},
+                            "total_s": total,
+                            "samples_per_s": samples / timings["start"],
+                            "peak_mb": peak / 2 ** 20,
+                        }
+                        results.append(result)
+                        print(f"# {name:10s} {engine:10s} {duration:6g}s "
+                              f"{frequency:6g}Hz  "
+                              + "  ".join(f"{stage} {timings[stage]:8.4f}s"
+                                          for stage in STAGES)
+                              + f"  {result['samples_per_s']:10.3g} samples/s"
+                              f"  {result['peak_mb']:8.1f}MB")
+    tracemalloc.stop()
+    with open(args.output, "w") as f:
+        json.dump({"commit": get_commit(), "date": time.strftime("%Y-%m-%d %H:%M:%S"),
+                   "python": platform.python_version(), "numpy": np.__version__,
+                   "machine": platform.platform(), "formats": args.formats,
+                   "results": results}, f, indent=1)
+    print(f"# Results saved to {args.output}")
+    if args.compare is not None:
+        compare(results, args.compare)
+
+if __name__ == '__main__':
+    main()
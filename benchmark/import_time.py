@@ -0,0 +1,49 @@
+import sys
+import argparse
+import subprocess
+import numpy as np
+
+# Each import is timed in a fresh interpreter, the package is found from the
+# root of the repository as in the other scripts
+ROOT = '../'
+
+CORE = ("Bearing_defect_simulation.Bearing.Bearing",
+        "Bearing_defect_simulation.DES.Acquisition",
+        "Bearing_defect_simulation.DES.Signal",
+        "Bearing_defect_simulation.DES.Simulation")
+ADAPTERS = ("Bearing_defect_simulation.DES.Report",
+            "Bearing_defect_simulation.DES.Plot")
+CASES = {
+    "numpy": ("numpy",),
+    "headless core": CORE,
+    "core + streamlit/matplotlib adapters": CORE + ADAPTERS,
+}
+
+def time_import(a_modules, a_repeat):
+    code = ("import sys, time; sys.path.insert(0, %r); t = time.perf_counter(); "
+            "%s; print(time.perf_counter() - t); "
+            "print(int('streamlit' in sys.modules), "
+            "int('matplotlib' in sys.modules))"
+            % (ROOT, "; ".join("import " + m for m in a_modules)))
+    timings = []
+    for i in range(a_repeat):
+        out = subprocess.run([sys.executable, "-c", code], check=True,
+                             capture_output=True, text=True).stdout.split()
+        timings.append(float(out[0]))
+    return np.array(timings), bool(int(out[1])), bool(int(out[2]))
+
+def main():
+    parser = argparse.ArgumentParser(description="Import time of the core")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    print("################# Import time benchmark  ########## ")
+    print("# Each case is imported in a fresh interpreter")
+    print("################################################### ")
+    for name, modules in CASES.items():
+        timings, streamlit, matplotlib = time_import(modules, args.repeat)
+        print(f"# {name:38s} median {1000 * np.median(timings):8.1f}ms"
+              f"  min {1000 * timings.min():8.1f}ms"
+              f"  streamlit: {streamlit}  matplotlib: {matplotlib}")
+
+if __name__ == '__main__':
+    main()
@@ -1,50 +1,104 @@
 import sys
+import functools
 import numpy as np
 import streamlit as st
 import matplotlib.pyplot as plt
-import io
 import pandas as pd
-import scipy.io
 
 sys.path.append('../')
-from Bearing_defect_simulation.DES.Simulation import Simulation
 from Bearing_defect_simulation.Bearing.Bearing import Bearing
-from Bearing_defect_simulation.Bearing.RollingElement import RollingElement
-from Bearing_defect_simulation.DES.Acquisition import Acquisition
+from Bearing_defect_simulation.DES.Presets import PRESETS, DEFAULT_PRESET
+from Bearing_defect_simulation.DES.Export import Export, FORMATS
+from Bearing_defect_simulation.DES.Cache import ResultCache
+from Bearing_defect_simulation.DES.Jobs import JobService, QUEUED, RUNNING, FAILED
+from Bearing_defect_simulation.DES.Nasa import get_targets, score_peaks
+from Bearing_defect_simulation.DES.Acquisition import get_frequency_axis
+from Bearing_defect_simulation.DES import Plot
+
+ENGINE = 'vectorized'
+
+@st.cache_resource
+def get_result_cache():
+    # One cache per server process, shared by the sessions and the reruns
+    return ResultCache()
+
+@st.cache_resource
+def get_job_service():
+    # The simulations run in a pool of processes shared by the sessions, the
+    # script thread only submits them and polls their progress
+    return JobService(a_cache=get_result_cache(), a_engine=ENGINE)
+
+@st.fragment(run_every=0.5)
+def show_progress(a_job):
+    # Only this fragment reruns while the job runs, the whole app reruns to
+    # show the results
+    status = get_job_service().get_status(a_job)
+    if status["state"] in (QUEUED, RUNNING):
+        passes = status["passes"]
+        st.progress(status["passes_computed"] / passes if passes else 0.0,
+                    text=f"Simulating: {status['passes_computed']} of "
+                    f"{passes or '...'} ball passes")
+    else:
+        st.rerun()
+
+@st.cache_resource(max_entries=4)
+def get_pyramids(a_job, _waveform, _spectrum, a_dt, a_df):
+    # Envelopes of the waveform and of the spectrum of a job, built once so
+    # zooming in only reads the levels. The arrays are not hashed, the job
+    # id is the content address of the result
+    return Plot.Pyramid(_waveform, 0.0, a_dt), Plot.Pyramid(_spectrum, 0.0, a_df)
 
 def run_simulation(a_n, a_dP, a_race, a_rpm,
                    a_dB, a_theta, a_L, a_N,
                    a_lambda, a_delta,
-                   a_duration, a_frequency, a_noise):
+                   a_duration, a_frequency, a_band=None,
+                   a_job=None, a_window=None):
     try:
-        my_bearing = Bearing(
-            a_n=a_n, a_dP=a_dP, a_race=a_race,
-            a_rpm=a_rpm, a_dB=a_dB, a_theta=a_theta,
-            a_L=a_L, a_N=a_N, a_lambda=a_lambda, a_delta=a_delta
-        )
-
-        my_acquisition = Acquisition(
-            a_duration=a_duration,
-            a_frequency=a_frequency,
-            a_noise=a_noise
-        )
-
-        my_simulation = Simulation(my_bearing, my_acquisition)
-        my_simulation.start()
-        results = my_simulation.get_results(format='show')
-      
-        if results is None or len(results) != 2:
-            st.error("Simulation returned invalid results.")
-            return None
-        else:
-            t, x = results
-            fig, ax = plt.subplots()
-            ax.plot(t, x, linewidth=1)
-            ax.set_title("Simulated Bearing Vibration Signal")
-            ax.set_xlabel("Time (s)")
-            ax.set_ylabel("Amplitude")
-            ax.grid(True)
-            return fig, results
+        # Result of the job of these parameters. Only the stages after the
+        # changed parameters ran: a new noise level or seed reuses the
+        # noise-free waveform, a new band reuses the spectrum
+        waveform, spectrum, stage = get_job_service().result(a_job)
+        if stage is None:
+            st.success("Simulation loaded from the cache.")
+        elif stage == 'noise':
+            st.success("Noise-free waveform loaded from the cache, noise added.")
+
+        # Spectrum in the displayed band, below a tenth of the sampling
+        # frequency by default as get_results
+        # The figures get about one point per pixel: the min/max envelope of
+        # the displayed window, read from the pyramids of the job
+        t = np.linspace(0, a_duration, len(waveform))
+        frequencies = get_frequency_axis(len(waveform), a_frequency)
+        waveform_pyramid, spectrum_pyramid = get_pyramids(
+            a_job, waveform, spectrum, t[1] - t[0] if len(t) > 1 else 1.0,
+            a_frequency / len(waveform))
+        f_min, f_max = a_band if a_band is not None else (0.0, a_frequency / 10)
+        st.pyplot(Plot.spectrum_figure(*spectrum_pyramid.get_window(f_min, f_max),
+                                       a_title="Simulated Spectrum", a_color="red",
+                                       a_points=None))
+
+        # Peaks at the harmonics of the defect frequencies
+        my_bearing = Bearing(a_n=a_n, a_dP=a_dP, a_race=a_race, a_rpm=a_rpm,
+                             a_dB=a_dB, a_theta=a_theta, a_L=a_L, a_N=a_N,
+                             a_lambda=a_lambda, a_delta=a_delta)
+        rows = []
+        for name, (score, peak) in score_peaks(frequencies, spectrum[None],
+                                               get_targets(my_bearing)).items():
+            for k in range(score.shape[1]):
+                rows.append({"Frequency": f"{k + 1} x {name}",
+                             "Peak (Hz)": peak[0, k],
+                             "Ratio to background": score[0, k]})
+        st.table(pd.DataFrame(rows))
+
+        results = (t, waveform)
+        fig, ax = plt.subplots()
+        t_min, t_max = a_window if a_window is not None else (None, None)
+        ax.plot(*waveform_pyramid.get_window(t_min, t_max), linewidth=1)
+        ax.set_title("Simulated Bearing Vibration Signal")
+        ax.set_xlabel("Time (s)")
+        ax.set_ylabel("Amplitude")
+        ax.grid(True)
+        return fig, results
 
     except Exception as e:
         st.error(f"Simulation failed inside run_simulation: {e}")
@@ -53,41 +107,12 @@ def run_simulation(a_n, a_dP, a_race, a_rpm,
 def main():
     st.title("Bearing Vibration Simulation")
 
-    # Define presets
-    presets = {
-        "CWRU": {
-            "a_n": 9, "a_dP": 47, "a_race": "outer", "a_rpm": 1772,
-            "a_dB": 6.75, "a_theta": 15.0, "a_L": 0.4, "a_N": 3,
-            "a_lambda": "0.18 0.18 0.18", "a_delta": "0.28 0 0.28",
-            "a_duration": 1.03, "a_frequency": 12000.0, "a_noise": 0.1
-        },
-        "NASA": {
-            "a_n": 8, "a_dP": 50.0, "a_race": "inner", "a_rpm": 2000,
-            "a_dB": 7.0, "a_theta": 15.0, "a_L": 3.0, "a_N": 4,
-            "a_lambda": "0.6 0.7 0.6 0.7", "a_delta": "0 0.4 0 0.5",
-            "a_duration": 1.0, "a_frequency": 20000.0, "a_noise": 0.1
-        },
-        "Paderborn": {
-            "a_n": 16, "a_dP": 100.0, "a_race": "outer", "a_rpm": 1500,
-            "a_dB": 10.0, "a_theta": 20.0, "a_L": 4.0, "a_N": 5,
-            "a_lambda": "0.8 0.8 0.8 0.8 0.8", "a_delta": "0.3 0 0 0.6 0.7",
-            "a_duration": 1.0, "a_frequency": 64000.0, "a_noise": 0.1
-        }
-    }
-
-    preset = {
-            "a_n": 16, "a_dP": 71.501, "a_race": "outer", "a_rpm": 2000,
-            "a_dB": 8.4074, "a_theta": 15.17, "a_L": 3.8, "a_N": 5,
-            "a_lambda": "0.7 0.7 0.8 0.8 0.8", "a_delta": "0.5 0 0.5 0 0.7",
-            "a_duration": 1.0, "a_frequency": 48000.0, "a_noise": 0.1
-        }
-
     with st.sidebar:
         # Dataset preset selector
         with st.expander(f"Preset Value:"):
             dataset = st.radio("Select preset value:", options=["Custom", "CWRU", "NASA", "Paderborn"])
 
-        preset = presets[dataset] if dataset in presets else preset
+        preset = PRESETS[dataset] if dataset in PRESETS else DEFAULT_PRESET
         st.header(f"Simulation Parameters {dataset}")
         a_n = st.number_input("Number of rolling elements (n)", min_value=1, value=preset["a_n"])
         a_dP = st.number_input("Pitch diameter (dP) [mm]", value=preset["a_dP"])
@@ -102,6 +127,15 @@ def main():
         a_duration = st.number_input("Duration (s)", value=preset["a_duration"])
         a_frequency = st.number_input("Frequency (Hz)", value=preset["a_frequency"])
         a_noise = st.slider("Noise level", min_value=0.0, max_value=0.9, value=preset["a_noise"])
+        a_seed = st.number_input("Noise seed", min_value=0, value=0, step=1)
+        # float32 halves the memory of the waveform and of the spectrum
+        a_dtype = st.selectbox("Precision", options=["float64", "float32"])
+        a_band = st.slider("Displayed band (Hz)", min_value=0.0,
+                           max_value=float(a_frequency) / 2,
+                           value=(0.0, float(a_frequency) / 10))
+        a_window = st.slider("Displayed time window (s)", min_value=0.0,
+                             max_value=float(a_duration),
+                             value=(0.0, float(a_duration)))
 
     with st.expander("Bearing Specifications", expanded=True, icon=":material/settings:"):
         bearing_specs = {
@@ -129,47 +163,50 @@ def main():
                 st.error(f"Mismatch: Length of λ = {len(a_lambda)}, δ = {len(a_delta)}; but N = {a_N}")
                 return
 
-            fig, results = run_simulation(
-                a_n, a_dP, a_race, a_rpm,
-                a_dB, a_theta, a_L, a_N,
-                a_lambda, a_delta,
-                a_duration, a_frequency, a_noise
-            )
+            params = dict(a_n=a_n, a_dP=a_dP, a_race=a_race, a_rpm=a_rpm,
+                          a_dB=a_dB, a_theta=a_theta, a_L=a_L, a_N=a_N,
+                          a_lambda=a_lambda, a_delta=a_delta,
+                          a_duration=a_duration, a_frequency=a_frequency,
+                          a_noise=a_noise, a_dtype=a_dtype, seed=a_seed)
+            # The results stay displayed until the next run
+            st.session_state["job"] = get_job_service().submit(params)
+            st.session_state["job_args"] = (a_n, a_dP, a_race, a_rpm, a_dB,
+                                            a_theta, a_L, a_N, a_lambda, a_delta,
+                                            a_duration, a_frequency)
+        except Exception as e:
+            st.error(f"Simulation failed outside: {e}")
+
+    if "job" in st.session_state:
+        try:
+            job = st.session_state["job"]
+            status = get_job_service().get_status(job)
+            if status["state"] in (QUEUED, RUNNING):
+                show_progress(job)
+                return
+            if status["state"] == FAILED:
+                st.error(f"Simulation failed inside the job: {status['error']}")
+                return
+            fig, results = run_simulation(*st.session_state["job_args"],
+                                          a_band=a_band, a_job=job,
+                                          a_window=a_window)
             if fig:
                 st.pyplot(fig)
 
             if results:
                 t, x = results
-                # Combine time and signal
-                data = np.column_stack((t, x))
-
-                # File buffers
-                buf_csv = io.StringIO()
-                buf_txt = io.StringIO()
-                buf_mat = io.BytesIO()
-                buf_npy = io.BytesIO()
-
-                # Save CSV and TXT
-                pd.DataFrame(data, columns=["Time", "Amplitude"]).to_csv(buf_csv, index=False)
-                np.savetxt(buf_txt, data, header="Time Amplitude", comments='')
-
-                # Save MAT and NPY
-                scipy.io.savemat(buf_mat, {"time": t, "signal": x})
-                np.save(buf_npy, data)
+                # Each format is only serialized when its button is clicked,
+                # and kept by the Export object for the next clicks
+                export = Export(t, x)
 
                 # Prepare for download buttons in one row
                 with st.container():
                     st.subheader("Download the raw data", divider=True)
 
-                    col1, col2, col3, col4 = st.columns(4)
-                    with col1:
-                        st.download_button("📥 CSV", buf_csv.getvalue(), "signal.csv", "text/csv")
-                    with col2:
-                        st.download_button("📥 TXT", buf_txt.getvalue(), "signal.txt", "text/plain")
-                    with col3:
-                        st.download_button("📥 MAT", buf_mat.getvalue(), "signal.mat", "application/octet-stream")
-                    with col4:
-                        st.download_button("📥 NPY", buf_npy.getvalue(), "signal.npy", "application/octet-stream")
+                    for column, (file_format, (file_name, mime)) in zip(st.columns(4), FORMATS.items()):
+                        with column:
+                            st.download_button(f"📥 {file_format.upper()}",
+                                               functools.partial(export.get, file_format),
+                                               file_name, mime, on_click="ignore")
 
         except Exception as e:
             st.error(f"Simulation failed outside: {e}")
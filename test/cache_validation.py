@@ -0,0 +1,92 @@
+import os
+import sys
+import tempfile
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+sys.path.append('../')
+from Bearing_defect_simulation.DES.Batch import run_one
+from Bearing_defect_simulation.DES.Cache import ResultCache, get_key, run_cached
+from Bearing_defect_simulation.DES.Presets import get_preset
+
+def evict_worker(a_folder, a_index):
+    # A worker of a job service: puts and gets of a few keys in a disk cache
+    #  small enough for every put to evict files of the other workers
+    cache = ResultCache(a_max_items=1, a_path=a_folder,
+                        a_max_disk_bytes=4 * 8 * 1024)
+    rng = np.random.default_rng(a_index)
+    for i in range(200):
+        key = f"key{rng.integers(16)}"
+        if cache.get(key) is None:
+            cache.put(key, np.full(1024, float(a_index)))
+    return True
+
+def main():
+    print("################# Cache validation  ############## ")
+    print("# This test runs a seeded simulation through the")
+    print("#  staged cache, then changes the noise level, the")
+    print("#  seed and the speed, and reloads the cache from")
+    print("#  disk.")
+    print("# Expected results:")
+    print("#    Only the stages after the changed parameter run")
+    print("#    Every waveform is the one of a simulation run")
+    print("#     from scratch")
+    print("#    Torn files are misses, written again")
+    print("#    Concurrent writers of a key do not collide")
+    print("#    Processes evicting the same disk cache do not")
+    print("#     fail on the files removed by the others")
+    print("################################################### ")
+    params = dict(get_preset("CWRU"), seed=7)
+    changes = [("first run", {}, 'simulation'), ("same run", {}, None),
+               ("noise level", {"a_noise": 0.4}, 'noise'),
+               ("seed", {"a_noise": 0.4, "seed": 8}, 'noise'),
+               ("speed", {"a_rpm": 1500}, 'simulation')]
+    failed = 0
+    with tempfile.TemporaryDirectory() as folder:
+        cache = ResultCache(a_path=folder)
+        for name, change, expected in changes:
+            run_params = dict(params, **change)
+            waveform, spectrum, stage = run_cached(cache, run_params)
+            same = np.array_equal(waveform, run_one(run_params))
+            ok = same and stage == expected
+            print(f"# {name:12s} stage run: {str(stage):10s} "
+                  f"{'OK' if ok else 'FAILED'}")
+            failed += not ok
+        # A new process finds both stages on disk
+        cache = ResultCache(a_path=folder)
+        stage = run_cached(cache, dict(params, a_noise=0.6))[2]
+        print(f"# {'from disk':12s} stage run: {str(stage):10s} "
+              f"{'OK' if stage == 'noise' else 'FAILED'}")
+        failed += stage != 'noise'
+        # Files truncated by a crash
+        for entry in os.scandir(folder):
+            with open(entry.path, "r+b") as f:
+                f.truncate(entry.stat().st_size // 2)
+        cache = ResultCache(a_path=folder)
+        waveform, spectrum, stage = run_cached(cache, params)
+        torn = stage == 'simulation' and np.array_equal(waveform, run_one(params)) \
+            and ResultCache(a_path=folder).get(get_key(params, 'vectorized')) is not None
+        print(f"# {'torn files':12s} stage run: {str(stage):10s} "
+              f"{'OK' if torn else 'FAILED'}")
+        failed += not torn
+        # Jobs differing only in noise write the same noise-free waveform
+        def write(a_index):
+            ResultCache(a_path=folder).put("shared", waveform, spectrum)
+        with ThreadPoolExecutor(8) as executor:
+            list(executor.map(write, range(64)))
+        shared = ResultCache(a_path=folder).get("shared")
+        concurrent = shared is not None and np.array_equal(shared[0], waveform) \
+            and not [name for name in os.listdir(folder) if ".tmp" in name]
+        print(f"# {'concurrent':12s} {'OK' if concurrent else 'FAILED'}")
+        failed += not concurrent
+    with tempfile.TemporaryDirectory() as folder:
+        try:
+            with ProcessPoolExecutor(8) as executor:
+                evicting = all(executor.map(evict_worker, [folder] * 8, range(8)))
+        except FileNotFoundError:
+            evicting = False
+        print(f"# {'evicting':12s} {'OK' if evicting else 'FAILED'}")
+        failed += not evicting
+    return failed
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,130 @@
+import numpy as np
+import os
+import sys
+import tempfile
+sys.path.append('../')
+from Bearing_defect_simulation.Bearing.Bearing import Bearing
+from Bearing_defect_simulation.Bearing.Defect import Defect
+from Bearing_defect_simulation.DES.Simulation import Simulation
+from Bearing_defect_simulation.DES.Acquisition import Acquisition
+
+def filter_interval_reference(a_delta, a_lambda):
+    # The original quadratic filtering, one argmin per interval
+    m_lambda = np.append(a_lambda, [0])
+    m_delta = np.append(a_delta, [0])
+    m_index_filtered = []
+    m_lambda_filtered = np.array([])
+    m_delta_filtered = np.array([])
+    m_x_pos_filtered = np.array([])
+    for i in range(len(m_delta)):
+        if np.argmin(m_delta[i:]) == 0:
+            m_index_filtered.append(i)
+            m_lambda_filtered = np.append(m_lambda_filtered, [m_lambda[i]])
+            m_delta_filtered = np.append(m_delta_filtered, [m_delta[i]])
+            m_x_pos_filtered = np.append(m_x_pos_filtered,
+                                         [np.sum(m_lambda[0:i])])
+    return (m_index_filtered, m_lambda_filtered, m_delta_filtered,
+            m_x_pos_filtered)
+
+def same_filtering(a_defect, a_reference):
+    # Same intervals, the positions are prefix sums instead of one sum per
+    # interval so they only agree up to the rounding
+    return np.array_equal(a_defect.m_index_filtered, a_reference[0]) \
+        and np.array_equal(a_defect.m_lambda_filtered, a_reference[1]) \
+        and np.array_equal(a_defect.m_delta_filtered, a_reference[2],
+                           equal_nan=True) \
+        and np.allclose(a_defect.m_x_pos_filtered, a_reference[3],
+                        rtol=1e-12, atol=0)
+
+def get_index_L(a_L, a_reference):
+    # First filtered interval beginning at the end of the defect
+    at_L = np.flatnonzero(a_reference[3] == a_L)
+    return int(at_L[0]) if at_L.size else len(a_reference[3])
+
+def thread_waveform(a_bearing):
+    my_acquisition = Acquisition(a_duration=0.2, a_frequency=20000, a_noise=0.0)
+    Simulation(a_bearing, my_acquisition, a_engine='thread', a_verbose=False,
+               a_seed=0).start()
+    return my_acquisition.m_waveform
+
+def with_reference(a_bearing, a_reference):
+    # Bearing whose defect keeps the intervals of the original filtering
+    defect = a_bearing.m_defect
+    defect.m_index_filtered = np.array(a_reference[0])
+    defect.m_lambda_filtered = a_reference[1]
+    defect.m_delta_filtered = a_reference[2]
+    defect.m_x_pos_filtered = a_reference[3]
+    defect.build_index()
+    return a_bearing
+
+def main():
+    print("################# Defect validation  ############## ")
+    print("# This test filters random defect profiles with  ")
+    print("#  Defect.filter_interval and with the original  ")
+    print("#  one argmin per interval algorithm, then loads  ")
+    print("#  a profile saved to .npy, .csv and .txt files.")
+    print("# Expected results:")
+    print("#    Both filterings keep the same intervals and")
+    print("#     the same interval beginning at L")
+    print("#    The thread engine writes the same waveform with")
+    print("#     both filterings")
+    print("#    The loaded defects equal Defect.from_profile")
+    print("################################################### ")
+    failed = 0
+    rng = np.random.default_rng(0)
+    for trial in range(200):
+        N = int(rng.integers(1, 300))
+        widths = rng.random(N)
+        # Repeated, zero and NaN depths exercise the ties of argmin
+        depths = np.round(rng.random(N) - 0.5, int(rng.integers(1, 4)))
+        if trial % 4 == 0:
+            depths[rng.random(N) < 0.1] = 0
+        if trial % 10 == 0:
+            depths[rng.integers(N)] = np.nan
+        defect = Defect(widths.sum(), N, widths, depths)
+        reference = filter_interval_reference(depths, widths)
+        failed += not (same_filtering(defect, reference) and defect.m_index_L
+                       == get_index_L(defect.m_L, reference))
+    print(f"# 200 random profiles: {'OK' if failed == 0 else 'FAILED'}")
+
+    # Intervals spanning the defect, L summed pairwise from 9 widths on.
+    #  The amplitudes come from the positions, equal up to the rounding
+    different = 0
+    for trial in range(20):
+        N = int(rng.integers(9, 40))
+        widths = rng.random(N) * 0.2
+        depths = rng.random(N) - 0.5
+        kwargs = dict(a_L=widths.sum(), a_N=N, a_lambda=widths, a_delta=depths)
+        bearing = Bearing(**kwargs)
+        reference = with_reference(Bearing(**kwargs),
+                                   filter_interval_reference(depths, widths))
+        different += not (bearing.m_defect.m_index_L
+                          < len(bearing.m_defect.m_x_pos_filtered)
+                          and np.allclose(thread_waveform(bearing),
+                                          thread_waveform(reference),
+                                          rtol=0, atol=1e-9))
+    print(f"# 20 thread runs: {'OK' if different == 0 else 'FAILED'}")
+    failed += different
+
+    depths = rng.random(1000) - 0.5
+    step = 0.002
+    reference = Defect.from_profile(depths, step)
+    same = reference.m_L == np.sum(np.full(1000, step)) \
+        and reference.m_x_pos_filtered[-1] == reference.m_L
+    with tempfile.TemporaryDirectory() as folder:
+        np.save(os.path.join(folder, "scan.npy"), depths)
+        np.savetxt(os.path.join(folder, "scan.txt"), depths)
+        np.savetxt(os.path.join(folder, "scan.csv"),
+                   np.column_stack((np.arange(1000) * step, depths)),
+                   delimiter=",")
+        for name in ("scan.npy", "scan.txt", "scan.csv"):
+            defect = Defect.from_file(os.path.join(folder, name), step)
+            same &= np.array_equal(defect.m_index_filtered,
+                                   reference.m_index_filtered) \
+                and np.allclose(defect.m_x_pos_filtered,
+                                reference.m_x_pos_filtered)
+    print(f"# Profile files: {'OK' if same else 'FAILED'}")
+    return failed + (not same)
+
+if __name__ == '__main__':
+    sys.exit(main())
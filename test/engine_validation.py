@@ -0,0 +1,73 @@
+import numpy as np
+import sys
+import time
+sys.path.append('../')
+from Bearing_defect_simulation.Bearing.Bearing import Bearing
+from Bearing_defect_simulation.DES.Simulation import Simulation
+from Bearing_defect_simulation.DES.Acquisition import Acquisition
+from Bearing_defect_simulation.DES.Presets import PRESETS, get_preset, \
+        split_preset
+
+def main():
+    print("################# Engine validation  ############## ")
+    print("# This test runs the simulation of each preset with ")
+    print("#  the threaded, the vectorized and the template  ")
+    print("#  engines, without noise, and of a finely")
+    print("#  discretized defect of 1000 intervals (threaded")
+    print("#  and vectorized engines only).")
+    print("# Expected results:")
+    print("#    The threaded and vectorized waveforms are equal")
+    print("#     sample for sample")
+    print("#    The template waveform has the same pulses, at ")
+    print("#     most one sample away from the threaded ones")
+    print("################################################### ")
+    failed = 0
+    for name in list(PRESETS) + ["Custom", "Fine"]:
+        if name == "Fine":
+            bearing_kwargs, acquisition_kwargs = get_fine_defect()
+        else:
+            bearing_kwargs, acquisition_kwargs = split_preset(get_preset(name))
+        acquisition_kwargs["a_noise"] = 0.0
+        waveforms = {}
+        for engine in ("thread", "vectorized", "template"):
+            my_acquisition = Acquisition(**acquisition_kwargs)
+            my_simulation = Simulation(Bearing(**bearing_kwargs),
+                    my_acquisition, a_engine=engine)
+            time_start = time.time()
+            my_simulation.start()
+            print(f"# {name} {engine}: {time.time() - time_start:.4f}s")
+            waveforms[engine] = my_acquisition.m_waveform
+        same = np.array_equal(waveforms["thread"], waveforms["vectorized"])
+        print(f"# {name} vectorized: {'OK' if same else 'FAILED'}")
+        if name == "Fine":
+            # One pulse per sample in the defect: shifting a pulse by one
+            # sample overwrites its neighbour, the pulses cannot be matched
+            failed += not same
+            continue
+        close = same_pulses(waveforms["thread"], waveforms["template"])
+        print(f"# {name} template: {'OK' if close else 'FAILED'}")
+        failed += (not same) + (not close)
+    return failed
+
+def get_fine_defect(a_N=1000):
+    # Custom bearing with a defect measured on a_N intervals, like a surface
+    # scan. The depths rise along the defect so every interval touches the ball
+    bearing_kwargs, acquisition_kwargs = split_preset(get_preset("Custom"))
+    rng = np.random.default_rng(0)
+    widths = rng.random(a_N)
+    bearing_kwargs["a_N"] = a_N
+    bearing_kwargs["a_lambda"] = widths / widths.sum() * bearing_kwargs["a_L"]
+    bearing_kwargs["a_delta"] = np.sort(-rng.random(a_N))
+    return bearing_kwargs, acquisition_kwargs
+
+def same_pulses(a_reference, a_waveform):
+    # Same pulse amplitudes in the same order, shifted by one sample at most
+    index_reference = np.flatnonzero(a_reference)
+    index = np.flatnonzero(a_waveform)
+    if index.size != index_reference.size:
+        return False
+    return np.array_equal(a_reference[index_reference], a_waveform[index]) \
+            and np.all(np.abs(index - index_reference) <= 1)
+
+if __name__ == '__main__':
+    sys.exit(main())
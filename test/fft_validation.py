@@ -0,0 +1,77 @@
+import sys
+import numpy as np
+sys.path.append('../')
+from Bearing_defect_simulation.Bearing.Bearing import Bearing
+from Bearing_defect_simulation.DES.Simulation import Simulation
+from Bearing_defect_simulation.DES.Acquisition import Acquisition, next_fast_len
+from Bearing_defect_simulation.DES.Presets import PRESETS, get_preset, \
+        split_preset
+
+# Bands (Hz) of the spectrum, a_fmax is excluded
+BANDS = ((0.0, None), (50.0, 500.0), (123.4, 5678.9), (1000.0, 1e9), (-10.0, 0.0))
+
+def get_reference(a_waveform, a_frequency):
+    # Spectrum of the complex FFT, as computed before the real FFT
+    fourierTransform = np.fft.fft(a_waveform) / len(a_waveform)
+    fourierTransform = fourierTransform[range(int(len(a_waveform) / 2))]
+    frequencies = np.arange(int(len(a_waveform) / 2)) / (len(a_waveform) / a_frequency)
+    return frequencies, abs(fourierTransform)
+
+def same_bands(a_acquisition):
+    reference_frequencies, reference = get_reference(a_acquisition.m_waveform,
+                                                     a_acquisition.m_frequency)
+    for fmin, fmax in BANDS:
+        frequencies, spectrum = a_acquisition.generate_fft(fmin, fmax)
+        band = (reference_frequencies >= fmin) & (
+            reference_frequencies < (np.inf if fmax is None else fmax))
+        if not (np.array_equal(frequencies, reference_frequencies[band])
+                and np.allclose(spectrum, reference[band], rtol=1e-9,
+                                atol=1e-12 * reference.max())):
+            return False
+    return True
+
+def same_padded(a_acquisition):
+    n = a_acquisition.m_waveform_len
+    n_fft = next_fast_len(n)
+    frequencies, spectrum = a_acquisition.generate_fft(a_pad=True)
+    # Bins of fs / n_fft up to the Nyquist frequency excluded
+    spacing = np.allclose(np.diff(frequencies), a_acquisition.m_frequency / n_fft) \
+        and frequencies[0] == 0 and len(frequencies) == n_fft // 2
+    # Zero-padded transform, still normalized by the waveform length
+    expected = np.abs(np.fft.fft(a_acquisition.m_waveform, n_fft))[:n_fft // 2] / n
+    return n_fft >= n and spacing and np.allclose(
+        spectrum, expected, rtol=1e-9, atol=1e-12 * expected.max())
+
+def main():
+    print("################# FFT validation  ################# ")
+    print("# This test computes the spectrum of the simulation")
+    print("#  of each preset, and of an odd number of samples,")
+    print("#  over several bands and zero-padded.")
+    print("# Expected results:")
+    print("#    The bins and amplitudes of each band are the")
+    print("#     ones of the complex FFT spectrum between fmin")
+    print("#     and fmax (excluded)")
+    print("#    The padded spectrum has bins of the sampling")
+    print("#     frequency / the 5-smooth length, amplitudes")
+    print("#     normalized by the waveform length")
+    print("################################################### ")
+    failed = 0
+    for name in list(PRESETS) + ["Custom", "Odd"]:
+        bearing_kwargs, acquisition_kwargs = split_preset(
+            get_preset("Custom" if name == "Odd" else name))
+        if name == "Odd":
+            acquisition_kwargs["a_duration"] = 12345 / acquisition_kwargs["a_frequency"]
+        my_acquisition = Acquisition(**acquisition_kwargs)
+        Simulation(Bearing(**bearing_kwargs), my_acquisition, a_engine='vectorized',
+                   a_verbose=False, a_seed=0).start()
+        bands = same_bands(my_acquisition)
+        padded = same_padded(my_acquisition)
+        print(f"# {name:10s} {my_acquisition.m_waveform_len} samples, bands: "
+              f"{'OK' if bands else 'FAILED'}  padded to "
+              f"{next_fast_len(my_acquisition.m_waveform_len)}: "
+              f"{'OK' if padded else 'FAILED'}")
+        failed += (not bands) + (not padded)
+    return failed
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,68 @@
+import sys
+sys.path.append('../')
+from Bearing_defect_simulation.Bearing.Bearing import Bearing
+from Bearing_defect_simulation.DES.Simulation import Simulation, ENGINES
+from Bearing_defect_simulation.DES.Acquisition import Acquisition
+from Bearing_defect_simulation.DES.Instrumentation import Instrumentation
+from Bearing_defect_simulation.DES.Presets import PRESETS, get_preset, \
+        split_preset
+
+COUNTERS = ("passes", "intervals_hit", "samples_written", "samples")
+
+def nested(a_events):
+    # Every 'end' closes the last stage begun, and all of them are closed
+    stack = []
+    for event, stage in a_events:
+        if event == 'begin':
+            stack.append(stage)
+        elif not stack or stack.pop() != stage:
+            return False
+    return not stack and len(a_events) > 0
+
+def main():
+    print("################# Instrumentation validation  #### ")
+    print("# This test runs the simulation of each preset with")
+    print("#  the threaded, the vectorized and the template")
+    print("#  engines, instrumented with 2 hooks, and with the")
+    print("#  memory of the stages.")
+    print("# Expected results:")
+    print("#    start() returns the instrumentation given")
+    print("#    The passes, intervals hit, samples written and")
+    print("#     samples are the same for the 3 engines")
+    print("#    The hooks are called begin then end around every")
+    print("#     stage, the second hook inside the first one")
+    print("#    The memory of every stage is recorded")
+    print("################################################### ")
+    failed = 0
+    for name in list(PRESETS) + ["Custom"]:
+        bearing_kwargs, acquisition_kwargs = split_preset(get_preset(name))
+        counters = {}
+        for engine in ENGINES:
+            events = []
+            hooks = [lambda a_event, a_stage: events.append((a_event, a_stage)),
+                     lambda a_event, a_stage: events.append((a_event, a_stage + "/inner"))]
+            instrumentation = Instrumentation(a_hooks=hooks, a_memory=True)
+            returned = Simulation(Bearing(**bearing_kwargs),
+                                  Acquisition(**acquisition_kwargs),
+                                  a_engine=engine, a_verbose=False, a_seed=0,
+                                  a_instrumentation=instrumentation).start()
+            counters[engine] = {key: instrumentation.m_counters.get(key)
+                                for key in COUNTERS}
+            same_object = returned is instrumentation
+            hooked = nested(events) and \
+                events.count(('begin', 'pulses')) == instrumentation.m_calls['pulses']
+            memory = set(instrumentation.m_allocated) == set(instrumentation.m_timings) \
+                and all(value > 0 for value in instrumentation.m_allocated.values())
+            ok = same_object and hooked and memory
+            print(f"# {name:10s} {engine:10s} returned: {'OK' if same_object else 'FAILED'}"
+                  f"  hooks: {'OK' if hooked else 'FAILED'}"
+                  f"  memory: {'OK' if memory else 'FAILED'}")
+            failed += not ok
+        same = all(counters[engine] == counters[ENGINES[0]] for engine in ENGINES)
+        print(f"# {name:10s} counters {counters[ENGINES[0]]}: "
+              f"{'OK' if same else 'FAILED'}")
+        failed += not same
+    return failed
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,72 @@
+import sys
+import time
+import asyncio
+import tempfile
+import numpy as np
+sys.path.append('../')
+from Bearing_defect_simulation.DES.Batch import run_one
+from Bearing_defect_simulation.DES.Cache import ResultCache
+from Bearing_defect_simulation.DES.Jobs import JobService, DONE, FAILED
+from Bearing_defect_simulation.DES.Presets import get_preset
+
+def main():
+    print("################# Job service validation  ####### ")
+    print("# This test submits simulations to the job service")
+    print("#  with a disk cache, polls their progress and")
+    print("#  waits for or awaits their results.")
+    print("# Expected results:")
+    print("#    Identical jobs share one id and one run")
+    print("#    The progress reaches the number of passes")
+    print("#    The results are the ones of run_one")
+    print("#    A noise change does not run the passes again")
+    print("#    No stage is kept once the results are read")
+    print("#    A failed job reports its error")
+    print("################################################### ")
+    folder = tempfile.TemporaryDirectory()
+    service = JobService(a_max_workers=2, a_cache=ResultCache(a_path=folder.name))
+    failed = 0
+    try:
+        long_run = dict(get_preset("CWRU"), a_duration=60, seed=1)
+        short_run = dict(get_preset("NASA"), seed=2)
+        time_start = time.perf_counter()
+        ids = [service.submit(params) for params in (long_run, short_run, long_run)]
+        submitted = time.perf_counter() - time_start
+        shared = ids[0] == ids[2] != ids[1] and len(service.m_jobs) == 2
+        print(f"# {len(ids)} jobs submitted in {submitted:.4f}s, "
+              f"identical jobs shared: {'OK' if shared else 'FAILED'}")
+        progress = []
+        while service.get_status(ids[0])["state"] != DONE:
+            status = service.get_status(ids[0])
+            if status["passes"]:
+                progress.append((status["passes_computed"], status["passes"]))
+            time.sleep(0.01)
+        print(f"# Progress of the long job: {progress[-1] if progress else None}")
+        results = [service.result(key) for key in ids]
+        same = all(np.array_equal(result[0], run_one(params)) for result, params
+                   in zip(results, (long_run, short_run, long_run)))
+        print(f"# Results: {'OK' if same else 'FAILED'}")
+        noise = service.submit(dict(short_run, a_noise=0.5))
+        waveform, spectrum, stage = asyncio.run(service.wait(noise))
+        awaited = stage == 'noise' \
+            and np.array_equal(waveform, run_one(dict(short_run, a_noise=0.5)))
+        print(f"# Awaited noise change, stage run {stage}: "
+              f"{'OK' if awaited else 'FAILED'}")
+        # Read while in flight, through the future of the job
+        in_flight = service.submit(dict(short_run, seed=3))
+        service.result(in_flight)
+        released = len(service.m_stages) == 0
+        print(f"# Stages released: {'OK' if released else 'FAILED'}")
+        bad = service.submit(dict(short_run, a_race='middle'))
+        while service.get_status(bad)["state"] not in (DONE, FAILED):
+            time.sleep(0.01)
+        error = service.get_status(bad)["state"] == FAILED
+        print(f"# Failed job: {'OK' if error else 'FAILED'}")
+        failed = (not shared) + (not same) + (not awaited) + (not released) \
+            + (not error)
+    finally:
+        service.shutdown()
+        folder.cleanup()
+    return failed
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,77 @@
+import os
+import sys
+import time
+import shutil
+import tempfile
+import numpy as np
+import pandas as pd
+sys.path.append('../')
+from Bearing_defect_simulation.Bearing.Bearing import Bearing
+from Bearing_defect_simulation.DES.Nasa import NASA_FREQUENCY, read_signal, \
+        load_signal, load_directory, get_spectra, compare_directory
+
+FILES = ["Nasa_Test2_BPFO.csv", "Nasa_Test3_BPFO.csv", "Nasa_Test3_Healthy.csv"]
+
+def main():
+    print("################# NASA validation  ############### ")
+    print("# This test loads the NASA files of this folder with")
+    print("#  the fast reader and from their binary copies, and")
+    print("#  compares the real and simulated peaks at the")
+    print("#  defect frequencies of the NASA bearing.")
+    print("# Expected results:")
+    print("#    The reader gives the values read by pandas")
+    print("#    The binary copies give the same values")
+    print("#    The batch spectra are the spectra of each file")
+    print("#    The simulated BPFO stands out of its background")
+    print("################################################### ")
+    reference = [pd.read_csv(name, sep=',', header=0).values[:, 0]
+                 for name in FILES]
+    read = all(np.array_equal(read_signal(name), signal)
+               for name, signal in zip(FILES, reference))
+    print(f"# Reader: {'OK' if read else 'FAILED'}")
+    with tempfile.TemporaryDirectory() as folder:
+        for name in FILES:
+            shutil.copy(name, folder)
+        cache = os.path.join(folder, "cache")
+        time_start = time.perf_counter()
+        names, signals = load_directory(folder, "*.csv", cache)
+        parsed = time.perf_counter() - time_start
+        time_start = time.perf_counter()
+        names_cached, signals_cached = load_directory(folder, "*.csv", cache)
+        cached = time.perf_counter() - time_start
+        print(f"# {len(names)} files parsed in {parsed:.4f}s, "
+              f"loaded from the cache in {cached:.4f}s")
+        # A modified file is parsed again
+        signal = load_signal(os.path.join(folder, FILES[0]), cache)
+        np.savetxt(os.path.join(folder, FILES[0]), signal[::-1],
+                   header="BPFO", comments='')
+        os.utime(os.path.join(folder, FILES[0]),
+                 (time.time() + 10, time.time() + 10))
+        modified = load_signal(os.path.join(folder, FILES[0]), cache)
+        same = names == names_cached == FILES \
+            and np.array_equal(signals, signals_cached) \
+            and np.array_equal(signals, np.stack(reference)) \
+            and np.array_equal(modified, signal[::-1]) \
+            and len(os.listdir(cache)) == len(FILES) \
+            and not any(".tmp" in name for name in os.listdir(cache))
+        print(f"# Cache: {'OK' if same else 'FAILED'}")
+    frequencies, spectra = get_spectra(signals, NASA_FREQUENCY)
+    n = signals.shape[1]
+    spectrum = np.abs(np.fft.fft(signals[1]))[:n // 2] / n
+    batch = np.allclose(spectra[1], spectrum) \
+        and np.isclose(frequencies[1], NASA_FREQUENCY / n)
+    print(f"# Batch spectra: {'OK' if batch else 'FAILED'}")
+    result = compare_directory('.', Bearing(a_rpm=2000), "Nasa_*.csv",
+                               a_cache=None)
+    for name, (score, peak) in result["real"].items():
+        for file_name, file_score, file_peak in zip(result["names"], score, peak):
+            print(f"# {file_name:24s} {name}: peaks at "
+                  f"{np.round(file_peak, 1)} Hz, {np.round(file_score, 1)}")
+    score, peak = result["simulated"]["BPFO"]
+    simulated = score[0, 0] > 5
+    print(f"# Simulation BPFO: peaks at {np.round(peak[0], 1)} Hz, "
+          f"{np.round(score[0], 1)}: {'OK' if simulated else 'FAILED'}")
+    return (not read) + (not same) + (not batch) + (not simulated)
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,70 @@
+import io
+import sys
+import time
+import numpy as np
+import matplotlib
+matplotlib.use("Agg")
+import matplotlib.pyplot as plt
+sys.path.append('../')
+from Bearing_defect_simulation.Bearing.Bearing import Bearing
+from Bearing_defect_simulation.DES.Simulation import Simulation
+from Bearing_defect_simulation.DES.Acquisition import Acquisition
+from Bearing_defect_simulation.DES import Plot
+
+def render(a_figure):
+    # Time to draw a figure and encode it as the app sends it to the browser
+    time_start = time.perf_counter()
+    a_figure.savefig(io.BytesIO(), format="png")
+    plt.close(a_figure)
+    return time.perf_counter() - time_start
+
+def main():
+    print("################# Plot validation  ############### ")
+    print("# This test simulates 60s at 64kHz and draws its")
+    print("#  waveform with every sample and reduced to the")
+    print("#  width of a figure, then zooms in random windows")
+    print("#  of the waveform through its pyramid.")
+    print("# Expected results:")
+    print("#    The reduced waveforms and windows have at most")
+    print("#     PLOT_POINTS points, in time order, with the")
+    print("#     minimum and maximum of the samples drawn")
+    print("#    The reduced figure is drawn much faster")
+    print("################################################### ")
+    my_acquisition = Acquisition(a_duration=60, a_frequency=64000)
+    Simulation(Bearing(), my_acquisition, a_engine='vectorized',
+               a_verbose=False, a_seed=0).start()
+    waveform = my_acquisition.m_waveform
+    time_axis = np.arange(len(waveform)) * my_acquisition.m_dt
+    failed = 0
+    for name, method in Plot.METHODS.items():
+        x, y = method(time_axis, waveform)
+        ok = len(y) <= Plot.PLOT_POINTS and np.all(np.diff(x) > 0)
+        if name == "minmax":
+            ok = ok and y.max() == waveform.max() and y.min() == waveform.min()
+        print(f"# {name:7s}: {len(y)} points {'OK' if ok else 'FAILED'}")
+        failed += not ok
+    full = render(Plot.waveform_figure(time_axis, waveform, a_points=None))
+    reduced = render(Plot.waveform_figure(time_axis, waveform))
+    print(f"# Figure of {len(waveform)} samples: {full:.3f}s, "
+          f"reduced: {reduced:.3f}s")
+    time_start = time.perf_counter()
+    pyramid = Plot.Pyramid(waveform, 0.0, my_acquisition.m_dt)
+    built = time.perf_counter() - time_start
+    rng = np.random.default_rng(0)
+    windows = 0
+    time_start = time.perf_counter()
+    for begin, end in np.sort(rng.random((100, 2)) * 60, axis=1):
+        x, y = pyramid.get_window(begin, end)
+        first = int(np.ceil(begin / my_acquisition.m_dt))
+        last = int(np.floor(end / my_acquisition.m_dt)) + 1
+        samples = waveform[first:last]
+        windows += len(y) <= Plot.PLOT_POINTS and np.all(np.diff(x) > 0) \
+            and y.max() == samples.max() and y.min() == samples.min()
+    elapsed = (time.perf_counter() - time_start) / 100
+    zoom = windows == 100 and full > reduced
+    print(f"# Pyramid built in {built:.3f}s, {elapsed * 1e3:.2f}ms per window: "
+          f"{'OK' if zoom else 'FAILED'}")
+    return failed + (not zoom)
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,98 @@
+import io
+import sys
+import numpy as np
+sys.path.append('../')
+from Bearing_defect_simulation.Bearing.Bearing import Bearing
+from Bearing_defect_simulation.DES.Simulation import Simulation
+from Bearing_defect_simulation.DES.Acquisition import Acquisition
+from Bearing_defect_simulation.DES.Export import Export
+from Bearing_defect_simulation.DES.Nasa import get_targets, score_peaks
+from Bearing_defect_simulation.DES.Presets import PRESETS, get_preset, \
+        split_preset
+
+def simulate(a_bearing_kwargs, a_acquisition_kwargs, a_engine, a_dtype):
+    my_acquisition = Acquisition(**a_acquisition_kwargs, a_dtype=a_dtype)
+    my_simulation = Simulation(Bearing(**a_bearing_kwargs), my_acquisition,
+                               a_engine=a_engine, a_verbose=False, a_seed=0)
+    my_simulation.start()
+    frequencies, spectrum = my_acquisition.get_fft()
+    return my_simulation, frequencies, spectrum
+
+def main():
+    print("################# Precision validation  ########## ")
+    print("# This test runs every preset in float64 and in")
+    print("#  float32 with the same seed and compares the peaks")
+    print("#  of their spectra at the BPFO and BPFI harmonics.")
+    print("# Expected results:")
+    print("#    The float32 waveform and spectrum are float32,")
+    print("#     half the memory, the float32 csv gives back the")
+    print("#     float32 values in fewer digits")
+    print("#    The time axis and the exported time column are")
+    print("#     float64, increasing by 1 / frequency, even for")
+    print("#     60s at 64kHz")
+    print("#    The noise-free float32 waveform is the float64")
+    print("#     one rounded to float32")
+    print("#    The peaks standing out of the noise are found at")
+    print("#     the same frequencies, to one bin")
+    print("################################################### ")
+    failed = 0
+    for name in list(PRESETS) + ["Custom"]:
+        bearing_kwargs, acquisition_kwargs = split_preset(get_preset(name))
+        for engine in ('vectorized', 'template'):
+            double, frequencies, spectrum_double = simulate(
+                bearing_kwargs, acquisition_kwargs, engine, np.float64)
+            single, frequencies_single, spectrum_single = simulate(
+                bearing_kwargs, acquisition_kwargs, engine, np.float32)
+            waveform = single.m_acquisition.m_waveform
+            time_axis, signal = single.get_results('as_array')
+            exported = np.load(io.BytesIO(
+                Export(time_axis, signal).get("npy")))
+            csv = Export(time_axis, signal).get("csv")
+            parsed = np.loadtxt(io.BytesIO(csv), delimiter=",", skiprows=1)
+            types = waveform.dtype == spectrum_single.dtype == np.float32 \
+                and waveform.nbytes * 2 == double.m_acquisition.m_waveform.nbytes \
+                and np.array_equal(parsed[:, 1].astype(np.float32), signal) \
+                and np.array_equal(exported[:, 1], signal) and len(csv) < len(
+                    Export(*double.get_results('as_array')).get("csv"))
+            # The time column is the one of the float64 run
+            times = time_axis.dtype == np.float64 and np.array_equal(
+                time_axis, double.get_results('as_array')[0]) \
+                and np.array_equal(parsed[:, 0], time_axis) \
+                and np.array_equal(exported[:, 0], time_axis)
+            # Without noise both engines write the same pulses
+            clean = [simulate(bearing_kwargs, dict(acquisition_kwargs, a_noise=0.0),
+                              engine, dtype)[0].m_acquisition.m_waveform
+                     for dtype in (np.float64, np.float32)]
+            rounded = np.array_equal(clean[0].astype(np.float32), clean[1])
+            resolution = frequencies[1] - frequencies[0]
+            deviation = 0.0
+            n_found = 0
+            scores = []
+            for spectra in (spectrum_double, spectrum_single):
+                scores.append(score_peaks(frequencies, spectra[None],
+                                          get_targets(double.m_bearing)))
+            # The noise of float32 runs is drawn in float32, another stream:
+            #  only the harmonics standing out of the noise are compared
+            for fault in ("BPFO", "BPFI"):
+                found = scores[0][fault][0] > 5
+                n_found += int(found.sum())
+                deviation = max(deviation, np.max(np.abs(
+                    scores[0][fault][1] - scores[1][fault][1])[found],
+                    initial=0) / resolution)
+            ok = types and times and rounded and deviation <= 1
+            print(f"# {name:10s} {engine:10s} dtypes: {'OK' if types else 'FAILED'}"
+                  f"  time: {'OK' if times else 'FAILED'}"
+                  f"  noise-free: {'OK' if rounded else 'FAILED'}"
+                  f"  {n_found} peaks, deviation: {deviation:.0f} bin "
+                  f"{'OK' if deviation <= 1 else 'FAILED'}")
+            failed += not ok
+    # A long float32 acquisition, 2^24 samples is where float32 steps stop
+    long_acquisition = Acquisition(a_duration=60, a_frequency=64000,
+                                   a_allocate=False, a_dtype=np.float32)
+    step = np.diff(long_acquisition.get_time_axis())
+    increasing = bool(np.all(np.abs(step * 64000 - 1) < 1e-6))
+    print(f"# 60s at 64kHz time axis: {'OK' if increasing else 'FAILED'}")
+    return failed + (not increasing)
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,12 +1,13 @@
 import numpy as np
 import matplotlib.pyplot as plt
 import sys
-import pandas as pd
 from PIL import Image
 sys.path.append('../')
 from Bearing_defect_simulation.Bearing.Bearing import Bearing
 from Bearing_defect_simulation.DES.Simulation import Simulation
 from Bearing_defect_simulation.DES.Acquisition import Acquisition
+from Bearing_defect_simulation.DES.Nasa import NASA_FREQUENCY, load_signal, \
+        get_spectra, get_targets, score_peaks
 
 def main():
     print("################# Replicative validation  ############## ")
@@ -23,11 +24,11 @@ def main():
     # Create the Bearing in the same config as Nasa
     my_bearing=Bearing(a_rpm=2000)
     # Create the Acquisition
-    my_acquisition=Acquisition(a_frequency=20480,a_noise=0.2)
+    my_acquisition=Acquisition(a_frequency=NASA_FREQUENCY,a_noise=0.2)
     # Create the Simulation start it and show the results
     my_simulation=Simulation(my_bearing,my_acquisition)
     my_simulation.start()
-    my_simulation.get_results(format='as_graph',
+    my_simulation.get_results(format='as_file',
             file_name='simulated_signal.png',title='Simulated Signal')
     plt.close()
     # Load and plot some NASA data from .csv (this can be changed 
@@ -35,10 +36,15 @@ def main():
     #       - Nasa_Test2_BPFO.csv 
     #       - Nasa_Test3_BPFO.csv 
     #       - Nasa_Test3_Healthy.csv
-    array=pd.read_csv('Nasa_Test3_BPFO.csv', sep=',',header=0).values
-    fft_res=generate_fft(array)
-    x=fft_res[0][:2000]
-    y=fft_res[1][:2000]
+    signal=load_signal('Nasa_Test3_BPFO.csv')
+    frequencies,spectra=get_spectra(signal[None],NASA_FREQUENCY)
+    x=frequencies[:2000]
+    y=spectra[0][:2000]
+    # Peaks of the real spectrum at the defect frequencies of the bearing
+    for name,(score,peak) in score_peaks(frequencies,spectra,
+            get_targets(my_bearing)).items():
+        print(f"# {name}: peaks at {np.round(peak[0],1)} Hz, "
+              f"{np.round(score[0],1)} times the background")
     plt.title("NASA real data")
     plt.xlabel("Freq (Hz)")
     plt.ylabel("Amplitude")
@@ -61,18 +67,5 @@ def get_concat_h(im1, im2):
     return dst
 
 
-def generate_fft(array):   
-    # helper, not from me
-    #ref:https://pythontic.com/visualization/signals/fouriertransform_fft 
-    fourierTransform = np.fft.fft(array)/20
-    fourierTransform = fourierTransform[range(int(len(array)/\
-            2))] # Exclude sampling frequency
-    tpCount     = len(array)
-    values      = np.arange(int(tpCount/2))
-    timePeriod  = tpCount/20000
-    frequencies = values/timePeriod
-    return (frequencies,abs(fourierTransform))
-
 if __name__ == '__main__':
     main()
-
@@ -0,0 +1,88 @@
+import sys
+import time
+import numpy as np
+sys.path.append('../')
+from Bearing_defect_simulation.Bearing.Bearing import Bearing
+from Bearing_defect_simulation.Bearing.Defect import Defect
+from Bearing_defect_simulation.DES.Simulation import Simulation
+from Bearing_defect_simulation.DES.Acquisition import Acquisition
+from Bearing_defect_simulation.DES.Scene import Scene, with_defect
+from Bearing_defect_simulation.DES.Nasa import get_spectra, get_targets, \
+        score_peaks
+from Bearing_defect_simulation.DES.Presets import PRESETS, get_preset, \
+        split_preset
+
+def simulate(a_bearing_kwargs, a_acquisition_kwargs, a_engine):
+    my_acquisition = Acquisition(**a_acquisition_kwargs)
+    Simulation(Bearing(**a_bearing_kwargs), my_acquisition, a_engine=a_engine,
+               a_verbose=False, a_seed=0).start()
+    return my_acquisition.m_waveform
+
+def main():
+    print("################# Scene validation  ############## ")
+    print("# This test simulates scenes of several bearings on")
+    print("#  the acquisition of each preset.")
+    print("# Expected results:")
+    print("#    A scene of one bearing gives the waveform of")
+    print("#     its simulation, noise included")
+    print("#    A scene of 4 bearings is the sum of the 4")
+    print("#     noise-free simulations scaled by their gains")
+    print("#    A bearing copied with an inner race defect is")
+    print("#     the bearing built with that defect")
+    print("#    Both bearings of a scene show their peaks")
+    print("################################################### ")
+    failed = 0
+    gains = [1.0, 0.5, 0.25, 0.125]
+    rpms = [1000, 1500, 2000, 2500]
+    for name in list(PRESETS) + ["Custom"]:
+        bearing_kwargs, acquisition_kwargs = split_preset(get_preset(name))
+        for engine in ('vectorized', 'template'):
+            single = Acquisition(**acquisition_kwargs)
+            scene = Scene(single, a_engine=engine, a_seed=0)
+            scene.add(Bearing(**bearing_kwargs))
+            scene.start()
+            same = np.array_equal(single.m_waveform,
+                                  simulate(bearing_kwargs, acquisition_kwargs, engine))
+            noise_free = dict(acquisition_kwargs, a_noise=0.0)
+            expected = sum(gain * simulate(dict(bearing_kwargs, a_rpm=rpm),
+                                           noise_free, engine)
+                           for gain, rpm in zip(gains, rpms))
+            multiple = Acquisition(**noise_free)
+            scene = Scene(multiple, a_engine=engine, a_seed=0)
+            for gain, rpm in zip(gains, rpms):
+                scene.add(Bearing(**dict(bearing_kwargs, a_rpm=rpm)), a_gain=gain)
+            time_start = time.perf_counter()
+            scene.start()
+            elapsed = time.perf_counter() - time_start
+            summed = np.allclose(multiple.m_waveform, expected, rtol=0, atol=1e-12)
+            print(f"# {name:10s} {engine:10s} single: {'OK' if same else 'FAILED'}"
+                  f"  4 bearings ({elapsed:.4f}s): {'OK' if summed else 'FAILED'}")
+            failed += (not same) + (not summed)
+    # Two bearings at different speeds, the second one with its own defect
+    #  on the inner race
+    my_acquisition = Acquisition(a_duration=1, a_frequency=20000, a_noise=0.1)
+    bearings = [Bearing(a_rpm=1500), Bearing(a_rpm=2000)]
+    defect = Defect.from_profile([0.4, 0, 0.6], 0.8)
+    inner = with_defect(bearings[1], defect, a_race='inner')
+    expected = Acquisition(a_duration=1, a_frequency=20000, a_noise=0.0)
+    Simulation(Bearing(a_rpm=2000, a_race='inner', a_defect=defect), expected,
+               a_engine='vectorized', a_verbose=False).start()
+    copied = Acquisition(a_duration=1, a_frequency=20000, a_noise=0.0)
+    Simulation(inner, copied, a_engine='vectorized', a_verbose=False).start()
+    races = np.array_equal(copied.m_waveform, expected.m_waveform)
+    print(f"# Inner race copy: {'OK' if races else 'FAILED'}")
+    scene = Scene(my_acquisition, a_seed=0)
+    scene.add(bearings[0])
+    scene.add(inner, a_gain=0.5)
+    scene.start()
+    frequencies, spectra = get_spectra(my_acquisition.m_waveform[None],
+                                       my_acquisition.m_frequency)
+    scores = [score_peaks(frequencies, spectra, get_targets(bearing))["BPFO"][0][0, 0]
+              for bearing in bearings]
+    peaks = all(score > 5 for score in scores)
+    print(f"# Peaks of both bearings: x{scores[0]:.1f}, x{scores[1]:.1f}: "
+          f"{'OK' if peaks else 'FAILED'}")
+    return failed + (not races) + (not peaks)
+
+if __name__ == '__main__':
+    sys.exit(main())
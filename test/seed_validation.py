@@ -0,0 +1,41 @@
+import numpy as np
+import sys
+import tempfile
+sys.path.append('../')
+from Bearing_defect_simulation.DES.Batch import Batch
+from Bearing_defect_simulation.DES.Dataset import DatasetWriter, DatasetReader
+
+def main():
+    print("################# Seed validation  ############### ")
+    print("# This test runs the same seeded sweep twice, over ")
+    print("#  2 processes and serially, writes it to a dataset")
+    print("#  and simulates every signal again from its seed.")
+    print("# Expected results:")
+    print("#    Every simulation has its own seed")
+    print("#    Both runs give the same waveforms")
+    print("#    The regenerated signals are the simulated ones,")
+    print("#     float32 sweeps included")
+    print("################################################### ")
+    sweep = {"a_rpm": [1000, 2000], "a_noise": [0.1, 0.5],
+             "a_dtype": ["float64", "float32"]}
+    batch = Batch(sweep, a_base="CWRU", a_max_workers=2, a_seed=2024)
+    serial = Batch(sweep, a_base="CWRU", a_max_workers=1, a_seed=2024)
+    seeds = [params["seed"] for params in batch.m_params]
+    distinct = len(set(seeds)) == len(seeds) \
+        and seeds == [params["seed"] for params in serial.m_params]
+    print(f"# Seeds: {'OK' if distinct else 'FAILED'}")
+    waveforms = batch.run()
+    same = all(np.array_equal(a, b) for a, b in zip(waveforms, serial.run()))
+    print(f"# Parallel and serial runs: {'OK' if same else 'FAILED'}")
+    with tempfile.TemporaryDirectory() as folder:
+        with DatasetWriter(folder) as writer:
+            for params, waveform in zip(batch.m_params, waveforms):
+                writer.append(waveform, params)
+        reader = DatasetReader(folder)
+        regenerated = all(np.array_equal(reader.regenerate(i), waveforms[i])
+                          for i in range(len(reader)))
+    print(f"# Regeneration: {'OK' if regenerated else 'FAILED'}")
+    return (not distinct) + (not same) + (not regenerated)
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,90 @@
+import sys
+import numpy as np
+import scipy.signal
+sys.path.append('../')
+from Bearing_defect_simulation.Bearing.Bearing import Bearing
+from Bearing_defect_simulation.DES.Simulation import Simulation
+from Bearing_defect_simulation.DES.Acquisition import Acquisition
+from Bearing_defect_simulation.DES.Signal import Signal, get_segment_plan
+from Bearing_defect_simulation.DES.Nasa import NASA_FREQUENCY, read_signal
+from Bearing_defect_simulation.DES.Presets import PRESETS, get_preset, \
+        split_preset
+
+FILES = ["Nasa_Test2_BPFO.csv", "Nasa_Test3_BPFO.csv", "Nasa_Test3_Healthy.csv"]
+# Band of the envelope spectrum searched for the defect peak (Hz)
+BAND = (50, 500)
+
+def get_signal(a_waveform, a_frequency):
+    return Signal(len(a_waveform), a_waveform, 1 / a_frequency, np.zeros(0))
+
+def same_welch(a_signal, a_frequency):
+    # Every window and a few segment lengths and overlaps against scipy
+    for window in ('hann', 'hamming', 'boxcar'):
+        for segment_len, overlap in ((1024, 0.5), (2048, 0.75), (500, 0)):
+            frequencies, psd = a_signal.get_welch(segment_len, overlap, window)
+            reference = scipy.signal.welch(
+                a_signal.m_waveform, fs=a_frequency, window=window,
+                nperseg=segment_len, noverlap=int(round(segment_len * overlap)))
+            # The DC bin of a mean-removed boxcar segment is rounding only
+            if not (np.allclose(frequencies, reference[0])
+                    and np.allclose(psd, reference[1], rtol=1e-9,
+                                    atol=1e-12 * reference[1].max())):
+                return False
+    return True
+
+def get_peak(a_signal):
+    # The envelope of the whole waveform is not kept in the plan cache
+    get_segment_plan.cache_clear()
+    frequencies, spectrum = a_signal.get_envelope_spectrum()
+    if get_segment_plan.cache_info().currsize:
+        return np.nan
+    band = (frequencies > BAND[0]) & (frequencies < BAND[1])
+    return frequencies[band][spectrum[band].argmax()]
+
+def main():
+    print("################# Signal validation  ############## ")
+    print("# This test computes the Welch PSD and the envelope")
+    print("#  spectrum of the simulation of each preset and of")
+    print("#  the NASA files of this folder.")
+    print("# Expected results:")
+    print("#    The Welch PSD is the one of scipy.signal.welch")
+    print("#    The envelope spectrum of the simulations peaks")
+    print("#     at a harmonic of their defect frequency, to one")
+    print("#     bin, no plan of the waveform length is cached")
+    print("#    The envelope spectrum of the NASA BPFO files")
+    print("#     peaks at the BPFO of the rig (2000 rpm), to 3%,")
+    print("#     not the one of the healthy file")
+    print("################################################### ")
+    failed = 0
+    for name in list(PRESETS) + ["Custom"]:
+        bearing_kwargs, acquisition_kwargs = split_preset(get_preset(name))
+        my_bearing = Bearing(**bearing_kwargs)
+        my_acquisition = Acquisition(**acquisition_kwargs)
+        Simulation(my_bearing, my_acquisition, a_engine='vectorized',
+                   a_verbose=False, a_seed=0).start()
+        frequency = my_acquisition.m_frequency
+        signal = get_signal(my_acquisition.m_waveform, frequency)
+        welch = same_welch(signal, frequency)
+        # Passes are spaced by 1 / BPFO on both races
+        peak = get_peak(signal)
+        bpfo = my_bearing.get_BPFO_freq()
+        found = abs(peak - round(peak / bpfo) * bpfo) \
+            <= frequency / my_acquisition.m_waveform_len
+        print(f"# {name:10s} welch: {'OK' if welch else 'FAILED'}  envelope "
+              f"peak {peak:.1f}Hz: {'OK' if found else 'FAILED'}")
+        failed += (not welch) + (not found)
+
+    bpfo = Bearing(a_rpm=2000).get_BPFO_freq()
+    for name in FILES:
+        signal = get_signal(read_signal(name), NASA_FREQUENCY)
+        welch = same_welch(signal, NASA_FREQUENCY)
+        peak = get_peak(signal)
+        found = abs(peak - bpfo) <= 0.03 * bpfo
+        expected = "Healthy" not in name
+        print(f"# {name:24s} welch: {'OK' if welch else 'FAILED'}  envelope "
+              f"peak {peak:.1f}Hz: {'OK' if found == expected else 'FAILED'}")
+        failed += (not welch) + int(found != expected)
+    return failed
+
+if __name__ == '__main__':
+    sys.exit(main())
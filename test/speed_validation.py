@@ -0,0 +1,95 @@
+import numpy as np
+import sys
+sys.path.append('../')
+from Bearing_defect_simulation.Bearing.Bearing import Bearing
+from Bearing_defect_simulation.DES.Simulation import Simulation
+from Bearing_defect_simulation.DES.Acquisition import Acquisition
+from Bearing_defect_simulation.DES.Presets import PRESETS, get_preset, \
+        split_preset
+
+def main():
+    print("################# Speed profile validation  ###### ")
+    print("# This test runs the template engine of each preset")
+    print("#  with a constant speed profile given as an array")
+    print("#  on the time grid, a function and 2 points, then")
+    print("#  a linear run-up from 600 to 2400 rpm and one")
+    print("#  from standstill to 2000 rpm.")
+    print("# Expected results:")
+    print("#    The constant profiles give the waveform of the")
+    print("#     constant speed engine")
+    print("#    The run-up passes enter when the integral of")
+    print("#     the pass frequency reaches each integer")
+    print("#    The streamed run-up is the simulated one")
+    print("#    The run-up from 0 rpm skips the pass entering")
+    print("#     at standstill, its 2-point and function")
+    print("#     profiles give the same passes")
+    print("################################################### ")
+    failed = 0
+    for name in list(PRESETS) + ["Custom"]:
+        bearing_kwargs, acquisition_kwargs = split_preset(get_preset(name))
+        acquisition_kwargs["a_noise"] = 0.0
+        rpm = float(bearing_kwargs["a_rpm"])
+        n = Acquisition(**acquisition_kwargs).m_waveform_len
+        waveforms = []
+        for profile in (None, np.full(n, rpm),
+                        lambda t: np.full(t.shape, rpm), [rpm, rpm]):
+            my_acquisition = Acquisition(**acquisition_kwargs)
+            Simulation(Bearing(**bearing_kwargs), my_acquisition,
+                       a_engine='template', a_verbose=False,
+                       a_rpm_profile=profile).start()
+            waveforms.append(my_acquisition.m_waveform)
+        same = all(np.array_equal(waveforms[0], w) for w in waveforms[1:])
+        print(f"# {name} constant profiles: {'OK' if same else 'FAILED'}")
+        failed += not same
+
+    bearing_kwargs, acquisition_kwargs = split_preset(get_preset("CWRU"))
+    acquisition_kwargs["a_duration"] = 2
+    my_bearing = Bearing(**bearing_kwargs)
+    my_acquisition = Acquisition(**acquisition_kwargs)
+    run_up = lambda t: 600 + 900 * t
+    my_simulation = Simulation(my_bearing, my_acquisition, a_engine='template',
+                               a_verbose=False, a_seed=0, a_rpm_profile=run_up)
+    # Phase of the run-up: (600 t + 450 t^2) / (rpm T) passes
+    rpm_T = my_bearing.m_rpm * 60 * my_bearing.m_duration_between_ball
+    i = np.arange(my_simulation.m_n_ball_to_pass)
+    time_enter = (np.sqrt(600 ** 2 + 1800 * i * rpm_T) - 600) / 900
+    error = np.abs(my_simulation.m_time_enter - time_enter).max()
+    close = error < 1e-3 * my_acquisition.m_dt \
+        and my_simulation.m_n_ball_to_pass == round(
+            (1200 + 1800) / rpm_T * my_bearing.get_BPFO_freq()
+            * my_bearing.m_duration_between_ball)
+    print(f"# Run-up entry times: {'OK' if close else 'FAILED'}"
+          f" (error {error:.2e}s)")
+    my_simulation.start()
+    streamed = Simulation(my_bearing, Acquisition(**acquisition_kwargs,
+                                                  a_allocate=False),
+                          a_engine='template', a_verbose=False, a_seed=0,
+                          a_rpm_profile=run_up).stream(4096)
+    same = np.array_equal(np.concatenate(list(streamed)),
+                          my_acquisition.m_waveform)
+    print(f"# Run-up stream: {'OK' if same else 'FAILED'}")
+    failed += (not close) + (not same)
+
+    # Run-up from standstill: (1000 t^2) / (rpm T) passes, pass 0 enters at
+    #  0 rpm and never runs through the defect
+    acquisition_kwargs["a_duration"] = 1
+    waveforms = []
+    standstill = True
+    for run_up in ([0, 2000], lambda t: 2000 * t):
+        my_acquisition = Acquisition(**acquisition_kwargs)
+        my_simulation = Simulation(my_bearing, my_acquisition, a_engine='template',
+                                   a_verbose=False, a_seed=0, a_rpm_profile=run_up)
+        my_simulation.start()
+        i = np.arange(1, my_simulation.m_n_ball_to_pass + 1)
+        standstill &= my_simulation.m_n_ball_to_pass == round(
+            1000 / rpm_T * my_bearing.get_BPFO_freq()
+            * my_bearing.m_duration_between_ball) - 1 \
+            and np.abs(my_simulation.m_time_enter
+                       - np.sqrt(i * rpm_T / 1000)).max() < 1e-3 * my_acquisition.m_dt
+        waveforms.append(my_acquisition.m_waveform)
+    standstill &= np.array_equal(*waveforms) and waveforms[0].any()
+    print(f"# Run-up from 0 rpm: {'OK' if standstill else 'FAILED'}")
+    return failed + (not standstill)
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,50 @@
+import sys
+import numpy as np
+sys.path.append('../')
+from Bearing_defect_simulation.Bearing.Bearing import Bearing
+from Bearing_defect_simulation.DES.Simulation import Simulation
+from Bearing_defect_simulation.DES.Acquisition import Acquisition
+from Bearing_defect_simulation.DES.Presets import PRESETS, get_preset, \
+        split_preset
+
+# Block lengths, most do not divide the waveform length
+BLOCK_LENS = (1, 997, 4096, 10000, 2 ** 16)
+
+def main():
+    print("################# Stream validation  ############## ")
+    print("# This test streams the simulation of each preset at")
+    print("#  constant speed, noise included, by blocks of")
+    print("#  several lengths with the vectorized and the")
+    print("#  template engines, without allocating the")
+    print("#  waveform of the acquisition.")
+    print("# Expected results:")
+    print("#    The blocks have the block length, the last one")
+    print("#     the rest of the waveform")
+    print("#    The blocks put end to end are the waveform of")
+    print("#     start() with the same seed")
+    print("################################################### ")
+    failed = 0
+    for name in list(PRESETS) + ["Custom"]:
+        bearing_kwargs, acquisition_kwargs = split_preset(get_preset(name))
+        for engine in ('vectorized', 'template'):
+            my_acquisition = Acquisition(**acquisition_kwargs)
+            Simulation(Bearing(**bearing_kwargs), my_acquisition, a_engine=engine,
+                       a_verbose=False, a_seed=0).start()
+            n = my_acquisition.m_waveform_len
+            for block_len in BLOCK_LENS:
+                streamed = Acquisition(**acquisition_kwargs, a_allocate=False)
+                blocks = list(Simulation(Bearing(**bearing_kwargs), streamed,
+                                         a_engine=engine, a_verbose=False,
+                                         a_seed=0).stream(block_len))
+                lengths = [len(block) for block in blocks]
+                sized = lengths[:-1] == [block_len] * (len(blocks) - 1) \
+                    and 0 < lengths[-1] <= block_len and streamed.m_waveform.size == 0
+                same = np.array_equal(np.concatenate(blocks), my_acquisition.m_waveform)
+                ok = sized and same
+                print(f"# {name:10s} {engine:10s} {n} samples, blocks of "
+                      f"{block_len}: {'OK' if ok else 'FAILED'}")
+                failed += not ok
+    return failed
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,88 @@
+import sys
+import time
+import numpy as np
+sys.path.append('../')
+from Bearing_defect_simulation.Bearing.Bearing import Bearing
+from Bearing_defect_simulation.DES.Simulation import Simulation
+from Bearing_defect_simulation.DES.Acquisition import Acquisition
+from Bearing_defect_simulation.DES.Fleet import Fleet
+from Bearing_defect_simulation.DES.Surrogate import get_comb, get_errors
+from Bearing_defect_simulation.DES.Presets import PRESETS, get_preset, \
+        split_preset
+
+HARMONICS = 8
+RPMS = np.linspace(600, 3000, 5)
+
+def get_fleet(a_bearing_kwargs, a_acquisition):
+    """Fleet of the preset bearing at RPMS on both races"""
+    kwargs = {key: value for key, value in a_bearing_kwargs.items()
+              if key not in ("a_N", "a_rpm", "a_race")}
+    return Fleet(a_acquisition, a_rpm=np.tile(RPMS, 2),
+                 a_race=np.repeat(["outer", "inner"], len(RPMS)), a_seed=0,
+                 **kwargs)
+
+def main():
+    print("################# Surrogate validation  ########## ")
+    print("# This test computes the harmonic comb of the")
+    print("#  surrogate for the bearing of each preset at 5")
+    print("#  speeds on both races and compares it to the")
+    print("#  spectra of the full simulation.")
+    print("# Expected results:")
+    print("#    The fleet waveform of the preset is the one of")
+    print("#     the template Simulation")
+    print("#    The surrogate bins are the harmonics of the")
+    print("#     BPFO to half a bin")
+    print("#    The amplitude error is below 5% on the first 5")
+    print("#     harmonics (median and max per harmonic shown)")
+    print("#    A million configurations are screened in seconds")
+    print("################################################### ")
+    failed = 0
+    for name in list(PRESETS) + ["Custom"]:
+        bearing_kwargs, acquisition_kwargs = split_preset(get_preset(name))
+        acquisition_kwargs = dict(acquisition_kwargs, a_noise=0.0)
+        my_acquisition = Acquisition(**acquisition_kwargs)
+        Simulation(Bearing(**bearing_kwargs), my_acquisition, a_engine='template',
+                   a_verbose=False, a_seed=0).start()
+        # The errors are measured against a fleet, check it is the engine
+        single = Fleet(Acquisition(**acquisition_kwargs), a_seed=0,
+                       **{key: value for key, value in bearing_kwargs.items()
+                          if key != "a_N"})
+        engine = np.allclose(single.start()[0], my_acquisition.m_waveform)
+        fleet = get_fleet(bearing_kwargs, Acquisition(**acquisition_kwargs))
+        frequencies, amplitudes = get_comb(fleet, HARMONICS)
+        resolution = my_acquisition.m_frequency / my_acquisition.m_waveform_len
+        harmonics = fleet.get_BPFO_freq()[:, None] * np.arange(1, HARMONICS + 1)
+        bins = np.isfinite(frequencies)
+        comb = np.all(np.abs(frequencies - harmonics)[bins] <= resolution / 2)
+        errors, offsets = get_errors(fleet, HARMONICS)
+        worst = np.nanmax(errors[:, :5])
+        ok = engine and comb and worst < 0.05
+        print(f"# {name:10s} engine: {'OK' if engine else 'FAILED'}"
+              f"  comb: {'OK' if comb else 'FAILED'}"
+              f"  max error (5 harmonics): {100 * worst:.2f}% "
+              f"{'OK' if worst < 0.05 else 'FAILED'}")
+        print(f"#    median error %: {np.round(100 * np.nanmedian(errors, axis=0), 2)}")
+        print(f"#    max error %:    {np.round(100 * np.nanmax(errors, axis=0), 2)}")
+        print(f"#    peaks off the surrogate bin: {int(np.nansum(offsets != 0))}"
+              f" of {int(bins.sum())}")
+        failed += not ok
+    # Screening of random configurations
+    rng = np.random.default_rng(0)
+    n_configurations = 10 ** 6
+    fleet = Fleet(Acquisition(a_duration=1.0, a_frequency=20000.0, a_noise=0.0),
+                  a_n=rng.integers(8, 20, n_configurations),
+                  a_rpm=rng.uniform(300, 3600, n_configurations),
+                  a_L=rng.uniform(1, 5, n_configurations),
+                  a_race=np.where(rng.random(n_configurations) < 0.5, "outer", "inner"),
+                  a_seed=0)
+    start = time.perf_counter()
+    frequencies, amplitudes = get_comb(fleet, 5)
+    elapsed = time.perf_counter() - start
+    screened = np.isfinite(amplitudes).all() and elapsed < 60
+    print(f"# {n_configurations} configurations screened in {elapsed:.1f}s"
+          f" {'OK' if screened else 'FAILED'}")
+    failed += not screened
+    return failed
+
+if __name__ == '__main__':
+    sys.exit(main())